@@ -0,0 +1,232 @@
+# Runs many (county, search term) searches at once on one browser and streams
+# each finished search table to the DB writer as soon as it is scraped.
+
+# Standard library
+import asyncio
+import csv
+import sys
+import time
+
+# Third-party packages
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import async_playwright
+
+# Local imports
+import browser_contexts
+import dbutils
+import throttle
+from main import counties
+from scraper_functions import (
+    drop_known_rows,
+    extract_rows_js,
+    finalize_results,
+    nxt_button_selector,
+    page_changed_js,
+    recorded_date_range,
+    results_state_js,
+    rows_from_raw,
+    search_box_selector,
+    search_button_selector,
+    set_url_params,
+    table_row_selector,
+)
+
+async def get_search_results_table(search, county, county_link, page, since=None):
+    """Async version of scraper_functions.get_search_results_table (Next-button walk, optional `since` watermark)."""
+    print(f"Searching for related files for: {search}")
+    host_throttle = throttle.for_url(county_link)  # shared with every other search on this host
+
+    await _throttled(host_throttle, page.goto(county_link))
+    await page.fill(search_box_selector, search)
+
+    # Wait for results (a timeout here is an error, not "no results"; see scraper_functions.wait_for_results)
+    state = await _throttled(
+        host_throttle,
+        page.click(search_button_selector),
+        page.wait_for_function(results_state_js, arg=table_row_selector),
+    )
+    if await state.json_value() != "rows":
+        print(f"No results for {search} in {county}")
+        return []
+
+    if since:
+        # Reload the results limited to documents recorded since the watermark
+        try:
+            state = await _throttled(
+                host_throttle,
+                page.goto(set_url_params(page.url, {"recordedDateRange": recorded_date_range(since), "offset": 0})),
+                page.wait_for_function(results_state_js, arg=table_row_selector, timeout=15000),
+            )
+            has_results = await state.json_value() == "rows"
+        except PlaywrightTimeoutError:
+            # The undated search had rows, so an empty date range is what's left
+            print(f"⚠️ Date-limited results didn't load for {search} in {county}, assuming nothing new")
+            has_results = False
+        if not has_results:
+            print(f"No results for {search} in {county} since {since}")
+            return []
+
+    results_list, reached_known = drop_known_rows(
+        rows_from_raw(await page.evaluate(extract_rows_js, table_row_selector), county_link), since
+    )
+    page_num = 1
+
+    #---- Page loop ----
+    while not reached_known:
+        next_btn = await page.query_selector(nxt_button_selector)
+        if not next_btn:
+            break
+        if await next_btn.is_disabled() or "disabled" in (await next_btn.get_attribute("class") or ""):
+            break
+
+        #save first row text to detect page change
+        first_row_text = await page.eval_on_selector(table_row_selector, "row => row.innerText.trim()")
+        await _throttled(host_throttle, next_btn.click(), page.wait_for_function(page_changed_js, arg=first_row_text))
+        page_num += 1
+
+        page_rows, reached_known = drop_known_rows(
+            rows_from_raw(await page.evaluate(extract_rows_js, table_row_selector), county_link), since
+        )
+        results_list.extend(page_rows)
+
+    print(f"Found {len(results_list)} results for {search} in {county} ({page_num} pages)")
+    return finalize_results(results_list, search, county)
+
+async def _throttled(host_throttle, *steps):
+    """
+    Wait for a token from `host_throttle`, then run the awaitables in order and record how
+    long they took, with the status of the navigation among them (page.goto's Response), if any.
+    Returns the last awaitable's result.
+    """
+    await host_throttle.acquire_async()
+    start = time.monotonic()
+    response = None
+    try:
+        for step in steps:
+            result = await step
+            if response is None and hasattr(result, "status"):
+                response = result
+    except Exception:
+        host_throttle.record_response(response, time.monotonic() - start, error=True, navigation=True)
+        for step in steps:
+            step.close()  # never-started coroutines, avoids "was never awaited" warnings
+        raise
+    host_throttle.record_response(response, time.monotonic() - start, navigation=True)
+    return result
+
+async def search_worker(browser, work_queue, result_queue):
+    """Owns one browser context and scrapes (county, search term, since) items off the work queue until it gets None."""
+    context = await browser_contexts.new_scraping_context_async(browser, "search")
+    page = await context.new_page()
+    try:
+        while True:
+            item = await work_queue.get()
+            try:
+                if item is None:
+                    return
+                county_name, search_term, since = item
+                county_link = counties[county_name]["link"]
+                search_table = await get_search_results_table(search_term, county_name, county_link, page, since)
+                await result_queue.put((county_name, search_term, search_table))
+            except Exception as e:
+                print(f"⚠️ Search failed for {item}: {e}")
+            finally:
+                work_queue.task_done()
+    finally:
+        await context.close()
+
+async def db_writer(result_queue, conn):
+    """Insert search tables as they arrive until it gets None. Inserts run in a thread so scraping keeps going."""
+    saved = 0
+    failed = 0
+    while True:
+        item = await result_queue.get()
+        if item is None:
+            break
+        county_name, search_term, search_table = item
+        try:
+            if search_table:
+                await asyncio.to_thread(dbutils.bulk_insert_search_table_results, search_table, conn)
+            # Only marked as scraped once its rows are in, so a failed batch is searched again next run
+            await asyncio.to_thread(dbutils.record_search, search_term, county_name, len(search_table), conn)
+            await asyncio.to_thread(dbutils.update_search_watermark, search_term, county_name, search_table, conn)
+            saved += 1
+        except Exception as e:
+            # Keep draining: a dead writer would leave every worker blocked on a full result_queue
+            failed += 1
+            await asyncio.to_thread(conn.rollback)
+            print(f"⚠️ Failed to save {len(search_table)} rows for {search_term} in {county_name}: {e}")
+    print(f"✅ Saved {saved} search tables" + (f", {failed} failed" if failed else ""))
+
+async def run_searches(work, max_contexts=4, headless=True, save_searches=True, skip_fresh=True, incremental=True):
+    """
+    Scrape every (county, search term) pair in `work` using one Chromium and
+    at most `max_contexts` browser contexts at a time.
+    Finished search tables are streamed to the DB as they complete.
+    skip_fresh drops pairs scraped within their county's cache_ttl_days.
+    incremental only fetches documents recorded since each pair's stored watermark.
+    """
+    work_queue = asyncio.Queue()
+    result_queue = asyncio.Queue(maxsize=max_contexts * 2)  # backpressure if the DB falls behind
+
+    pool = dbutils.get_pool() if save_searches else None
+    conn = pool.getconn() if save_searches else None
+    try:
+        if conn is not None:
+            dbutils.ensure_schema(conn)
+            if skip_fresh:
+                # Searches still inside their county's cache_ttl_days don't need the browser
+                fresh = {
+                    (county_name, search_term) for county_name, search_term in work
+                    if dbutils.search_is_fresh(search_term, county_name, conn, counties[county_name].get("cache_ttl_days"))
+                }
+                work = [item for item in work if tuple(item) not in fresh]
+                print(f"Skipping {len(fresh)} searches that are still fresh in the DB")
+
+        for county_name, search_term in work:
+            since = None
+            if conn is not None and incremental:
+                since = dbutils.get_search_watermark(search_term, county_name, conn)
+            work_queue.put_nowait((county_name, search_term, since))
+        for _ in range(max_contexts):
+            work_queue.put_nowait(None)  # one stop signal per worker
+
+        async with async_playwright() as p:
+            browser = await browser_contexts.launch_browser_async(p, headless=headless)
+
+            if save_searches:
+                writer = asyncio.create_task(db_writer(result_queue, conn))
+            else:
+                writer = asyncio.create_task(_drain(result_queue))
+
+            workers = [
+                asyncio.create_task(search_worker(browser, work_queue, result_queue))
+                for _ in range(max_contexts)
+            ]
+            await asyncio.gather(*workers)
+
+            await result_queue.put(None)
+            await writer
+            await browser.close()
+    finally:
+        if conn is not None:
+            pool.putconn(conn)
+
+async def _drain(result_queue):
+    while await result_queue.get() is not None:
+        pass
+
+def load_work(csv_path):
+    """Read (county, search_term) pairs from a two column CSV."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return [(row[0].strip(), row[1].strip()) for row in csv.reader(f) if len(row) >= 2 and row[0].strip()]
+
+if __name__ == "__main__":
+    # Usage: python async_pipeline.py work.csv [max_contexts]
+    if len(sys.argv) > 1:
+        work = load_work(sys.argv[1])
+    else:
+        work = [("Freestone", "Emma Stone"), ("Freestone", "Alford John")]
+    max_contexts = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    asyncio.run(run_searches(work, max_contexts=max_contexts))
@@ -0,0 +1,110 @@
+# Lightweight Chromium + context factory for scraping GovOS sites.
+# Contexts abort requests the scrapers never read (fonts, media, analytics/trackers,
+# and on search contexts images/thumbnails too), which cuts page weight and
+# navigation time and lets more contexts share one machine.
+# Create a context once and reuse it across searches; routes are set up per context.
+
+# Standard library
+from urllib.parse import urlsplit
+
+# Chromium switches that turn off features a headless scraper has no use for
+launch_args = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+]
+
+# Resource types aborted per context purpose. Document contexts keep images
+# (the viewer's page image is what screenshot mode captures).
+blocked_resource_types = {
+    "search": {"image", "font", "media", "manifest", "texttrack", "eventsource", "websocket"},
+    "document": {"font", "media", "manifest", "texttrack"},
+}
+
+# Analytics / tracking / monitoring hosts (suffix match)
+tracker_hosts = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "fullstory.com",
+    "intercom.io",
+    "newrelic.com",
+    "nr-data.net",
+    "sentry.io",
+    "pendo.io",
+    "mixpanel.com",
+    "heap.io",
+)
+
+context_options = {
+    "viewport": {"width": 1280, "height": 900},
+    "service_workers": "block",  # requests from service workers would skip the routes
+    "reduced_motion": "reduce",
+    "locale": "en-US",
+}
+
+def is_tracker(url):
+    host = urlsplit(url).hostname or ""
+    return any(host == tracker or host.endswith("." + tracker) for tracker in tracker_hosts)
+
+def should_block(request, blocked_types):
+    return request.resource_type in blocked_types or is_tracker(request.url)
+
+def _blocked_types(purpose):
+    if purpose not in blocked_resource_types:
+        raise ValueError(f"Unknown context purpose: {purpose}")
+    return blocked_resource_types[purpose]
+
+#---- Sync API ----
+def launch_browser(playwright, headless=True):
+    """Chromium launched with launch_args."""
+    return playwright.chromium.launch(headless=headless, args=launch_args)
+
+def new_scraping_context(browser, purpose="search"):
+    """
+    New context that aborts unneeded requests.
+    purpose="search" also blocks images (result tables are text);
+    purpose="document" keeps images for the document viewer.
+    """
+    blocked_types = _blocked_types(purpose)
+    context = browser.new_context(**context_options)
+
+    def handle(route):
+        if should_block(route.request, blocked_types):
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route("**/*", handle)
+    return context
+
+#---- Async API ----
+async def launch_browser_async(playwright, headless=True):
+    return await playwright.chromium.launch(headless=headless, args=launch_args)
+
+async def new_scraping_context_async(browser, purpose="search"):
+    """Async version of new_scraping_context."""
+    blocked_types = _blocked_types(purpose)
+    context = await browser.new_context(**context_options)
+
+    async def handle(route):
+        if should_block(route.request, blocked_types):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", handle)
+    return context
@@ -1,7 +1,178 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import psycopg
+from dotenv import load_dotenv
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
+
+def get_conninfo():
+    """Build the connection string from the DB_* variables in the landman .env file."""
+    #Load environment variables
+    #DB_NAME, DB_USER, DB_PASSWORD
+    load_dotenv(dotenv_path=r"C:\Users\milom\Documents\landman\.env")
+
+    return make_conninfo(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+    )
+
+def connect():
+    """Open a single psycopg connection (notebooks / one-off scripts). Scrapers should use get_pool()."""
+    return psycopg.connect(get_conninfo())
+
+_pool = None
+
+def get_pool(min_size=1, max_size=None):
+    """
+    Return the process-wide connection pool, opening it on first use.
+    max_size defaults to the DB_POOL_SIZE env variable (or 5).
+    Borrow with `with get_pool().connection() as conn:` or getconn()/putconn().
+    """
+    global _pool
+    if _pool is None:
+        if max_size is None:
+            max_size = int(os.getenv("DB_POOL_SIZE", "5"))
+        _pool = ConnectionPool(
+            get_conninfo(),
+            min_size=min(min_size, max_size),
+            max_size=max_size,
+            open=True,
+            name="landman",
+        )
+    return _pool
+
+def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+def ensure_schema(conn):
+    """Create the helper tables this module needs if they don't exist yet."""
+    with conn.cursor() as cur:
+        # When each (search term, county) was last scraped, for the search cache freshness check
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS clerk.search_log (
+                search_term     text NOT NULL,
+                source_county   text NOT NULL,
+                last_scraped_at timestamptz NOT NULL DEFAULT NOW(),
+                result_count    integer,
+                PRIMARY KEY (search_term, source_county)
+            );
+        """)
+        # High-water mark of what's already stored, for incremental searches
+        cur.execute("""
+            ALTER TABLE clerk.search_log
+                ADD COLUMN IF NOT EXISTS max_recorded_date date,
+                ADD COLUMN IF NOT EXISTS max_doc_number text;
+        """)
+        # Which documents each (search term, county) returned. document_header.search_term only
+        # holds the latest search that touched a document, so cached tables are rebuilt from here
+        cur.execute("SELECT to_regclass('clerk.search_result') IS NOT NULL;")
+        has_search_result = cur.fetchone()[0]
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS clerk.search_result (
+                search_term        text NOT NULL,
+                source_county      text NOT NULL,
+                document_header_id bigint NOT NULL REFERENCES clerk.document_header (id) ON DELETE CASCADE,
+                PRIMARY KEY (search_term, source_county, document_header_id)
+            );
+        """)
+        if not has_search_result:
+            # Seed from the documents stored before the table existed
+            cur.execute("""
+                INSERT INTO clerk.search_result (search_term, source_county, document_header_id)
+                SELECT search_term, source_county, id
+                FROM clerk.document_header
+                WHERE search_term IS NOT NULL AND source_county IS NOT NULL
+                ON CONFLICT DO NOTHING;
+            """)
+        # One clerk.party row per name, so loaders on different connections can insert
+        # parties with ON CONFLICT instead of racing each other into duplicates
+        cur.execute("SELECT to_regclass('clerk.party_party_name_key') IS NOT NULL;")
+        if not cur.fetchone()[0]:
+            # Merge the duplicates already stored into the lowest id of each name first
+            cur.execute("""
+                CREATE TEMP TABLE party_merge ON COMMIT DROP AS
+                SELECT id, MIN(id) OVER (PARTITION BY party_name) AS keep_id
+                FROM clerk.party
+                WHERE party_name IN (
+                    SELECT party_name FROM clerk.party GROUP BY party_name HAVING COUNT(*) > 1
+                );
+            """)
+            cur.execute("""
+                DELETE FROM clerk.document_party_role r
+                USING party_merge m
+                WHERE r.party_id = m.id
+                  AND EXISTS (
+                      SELECT 1
+                      FROM clerk.document_party_role k
+                      JOIN party_merge km ON km.id = k.party_id
+                      WHERE km.keep_id = m.keep_id
+                        AND k.document_header_id = r.document_header_id
+                        AND k.role = r.role
+                        AND k.party_id < r.party_id
+                  );
+            """)
+            cur.execute("""
+                UPDATE clerk.document_party_role r
+                SET party_id = m.keep_id
+                FROM party_merge m
+                WHERE r.party_id = m.id AND m.id <> m.keep_id;
+            """)
+            cur.execute("""
+                DELETE FROM clerk.party p
+                USING party_merge m
+                WHERE p.id = m.id AND m.id <> m.keep_id;
+            """)
+            print(f"🧹 Merged {cur.rowcount} duplicate parties")
+            cur.execute("CREATE UNIQUE INDEX party_party_name_key ON clerk.party (party_name);")
+        # Hash of the stored document's page images (doc_path points at <content_hash>.pdf)
+        cur.execute("""
+            ALTER TABLE clerk.document_header
+                ADD COLUMN IF NOT EXISTS content_hash text;
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS document_header_content_hash_idx
+                ON clerk.document_header (content_hash);
+        """)
+        # Persistent document download queue (see download_worker.py)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS clerk.download_queue (
+                id              bigserial PRIMARY KEY,
+                doc_number      text NOT NULL,
+                source_county   text NOT NULL,
+                doc_link        text NOT NULL,
+                priority        integer NOT NULL DEFAULT 8,
+                recorded_date   date,
+                status          text NOT NULL DEFAULT 'pending',  -- pending / in_progress / done / failed
+                attempts        integer NOT NULL DEFAULT 0,
+                last_error      text,
+                claimed_by      text,
+                claimed_at      timestamptz,
+                next_attempt_at timestamptz NOT NULL DEFAULT NOW(),
+                finished_at     timestamptz,
+                created_at      timestamptz NOT NULL DEFAULT NOW(),
+                UNIQUE (doc_number, source_county)
+            );
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS download_queue_claim_idx
+                ON clerk.download_queue (status, priority, recorded_date DESC);
+        """)
+    conn.commit()
 
 
 # db_utils.py or scraper_functions.py
-def insert_search_table_results(results_list, conn):
+def insert_search_table_results(results_list, conn, resolver=None):
     doc_cols = [
         "search_term", "doc_type", "recorded_date", "doc_number",
         "book_vol_page", "legal_description", "source_county", "doc_link",
@@ -25,7 +196,7 @@ def insert_search_table_results(results_list, conn):
             book_vol_page   = EXCLUDED.book_vol_page,
             legal_description = EXCLUDED.legal_description,
             doc_link        = EXCLUDED.doc_link,
-            doc_path        = EXCLUDED.doc_path,
+            doc_path        = COALESCE(EXCLUDED.doc_path, clerk.document_header.doc_path),
             abstract_num    = EXCLUDED.abstract_num,
             county          = EXCLUDED.county,
             survey_name     = EXCLUDED.survey_name,
@@ -37,61 +208,302 @@ def insert_search_table_results(results_list, conn):
         RETURNING id;
     """
 
-    insert_party_sql = """
-        INSERT INTO clerk.party (party_name)
-        VALUES (%s)
-        RETURNING id;
-    """
-
-    select_party_sql = """
-        SELECT id FROM clerk.party WHERE party_name = %s LIMIT 1;
-    """
-
     insert_role_sql = """
         INSERT INTO clerk.document_party_role (document_header_id, party_id, role, original_name)
         VALUES (%s, %s, %s, %s)
         ON CONFLICT DO NOTHING;
     """
 
-    with conn.cursor() as cur:
-        for row in results_list:
+    insert_result_sql = """
+        INSERT INTO clerk.search_result (search_term, source_county, document_header_id)
+        VALUES (%s, %s, %s)
+        ON CONFLICT DO NOTHING;
+    """
+
+    resolver = resolver or party_resolver
+
+    try:
+        with conn.cursor() as cur:
+            # 1) Resolve every grantor/grantee in the table in one batch
+            names = [row.get(role) for row in results_list for role in ("grantor", "grantee")]
+            party_ids, new_party_ids = resolver.resolve(names, cur)
+
+            # 2) UPSERT documents, all statements sent in one pipeline
+            doc_values = [tuple(row.get(c) for c in doc_cols) for row in results_list]
+            document_ids = []
+            if doc_values:
+                with conn.pipeline():
+                    cur.executemany(insert_doc_sql, doc_values, returning=True)
+                while True:
+                    document_ids.append(cur.fetchone()[0])
+                    if not cur.nextset():
+                        break
+
+            # 3) Link party + doc
+            role_values = []
+            for row, document_id in zip(results_list, document_ids):
+                for role in ("grantor", "grantee"):
+                    name = row.get(role)
+                    if not name or not name.strip():
+                        continue
+
+                    name = name.strip()
+                    role_values.append((document_id, party_ids[name], role, name))
+
+            if role_values:
+                with conn.pipeline():
+                    cur.executemany(insert_role_sql, role_values)
+
+            # 4) Remember which search returned each document
+            result_values = {
+                (row.get("search_term"), row.get("source_county"), document_id)
+                for row, document_id in zip(results_list, document_ids)
+                if row.get("search_term") and row.get("source_county")
+            }
+            if result_values:
+                with conn.pipeline():
+                    cur.executemany(insert_result_sql, list(result_values))
 
-            # 1) UPSERT document
-            values = tuple(row.get(c) for c in doc_cols)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    resolver.commit(new_party_ids)
 
-            cur.execute(insert_doc_sql, values)
-            document_id = cur.fetchone()[0]
 
-            # 2) Party loading
-            for role in ("grantor", "grantee"):
-                name = row.get(role)
+class PartyResolver:
+    """
+    In-process cache of clerk.party party_name -> id, bounded as an LRU.
+
+    resolve() looks up all uncached names with one ANY(%s) query and inserts
+    the ones still missing with one INSERT ... ON CONFLICT (party_name), then
+    re-selects the names another connection inserted first, so concurrent
+    writers never create duplicate parties. Ids of parties inserted by a
+    call are returned to the caller rather than cached, and only enter the
+    shared cache through commit() once that caller's transaction commits, so
+    a rollback or another connection's transaction can't see ids for rows
+    that don't exist. The cache is shared by pooled connections and threads,
+    so it is only touched under a lock.
+    """
+
+    def __init__(self, maxsize=200_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, name, party_id):
+        self._ids[name] = party_id
+        self._ids.move_to_end(name)
+        if len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)  # drop least recently used
+
+    def resolve(self, names, cur):
+        """
+        Return ({stripped name: party id} for every non-blank name, {name: id} of the
+        parties inserted by this call). Pass the second dict to commit() after the
+        transaction on `cur` commits; drop it if it rolls back.
+        """
+        result = {}
+        inserted = {}
+        missing = []
+        with self._lock:
+            for name in names:
                 if not name or not name.strip():
                     continue
-
                 name = name.strip()
-
-                # Try insert
-                cur.execute(insert_party_sql, (name,))
-                r = cur.fetchone()
-                if r:
-                    party_id = r[0]
+                if name in result:
+                    continue
+                if name in self._ids:
+                    self.hits += 1
+                    self._ids.move_to_end(name)
+                    result[name] = self._ids[name]
                 else:
-                    # fallback lookup
-                    cur.execute(select_party_sql, (name,))
-                    party_id = cur.fetchone()[0]
-
-                # 3) Link party + doc
-                cur.execute(
-                    insert_role_sql,
-                    (document_id, party_id, role, name)
+                    self.misses += 1
+                    result[name] = None
+                    missing.append(name)
+
+        if missing:
+            self._select(missing, cur, result)
+
+            new_names = [name for name in missing if result[name] is None]
+            if new_names:
+                cur.execute("""
+                    INSERT INTO clerk.party (party_name)
+                    SELECT unnest(%s::text[])
+                    ON CONFLICT (party_name) DO NOTHING
+                    RETURNING party_name, id;
+                """, (new_names,), prepare=True)
+                for name, party_id in cur.fetchall():
+                    result[name] = party_id
+                    inserted[name] = party_id
+
+                # Names another transaction committed between our SELECT and INSERT
+                raced = [name for name in new_names if result[name] is None]
+                if raced:
+                    self._select(raced, cur, result)
+
+        return result, inserted
+
+    def _select(self, names, cur, result):
+        """Fill `result` with the committed ids of `names` and cache them."""
+        cur.execute("""
+            SELECT party_name, id
+            FROM clerk.party
+            WHERE party_name = ANY(%s);
+        """, (names,), prepare=True)
+        rows = cur.fetchall()
+        with self._lock:
+            for name, party_id in rows:
+                result[name] = party_id
+                self._remember(name, party_id)
+
+    def commit(self, inserted):
+        """Cache the ids resolve() inserted, once the transaction that inserted them has committed."""
+        with self._lock:
+            for name, party_id in inserted.items():
+                self._remember(name, party_id)
+
+    def info(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._ids), "maxsize": self.maxsize}
+
+# Shared resolver used by insert_search_table_results when none is passed
+# (bulk_insert_search_table_results resolves parties set-based and needs no cache)
+party_resolver = PartyResolver()
+
+
+def bulk_insert_search_table_results(results_list, conn):
+    """
+    Set-based version of insert_search_table_results for large search tables.
+
+    Rows are COPY'd into temp staging tables, then merged with one
+    INSERT ... ON CONFLICT per target table (document_header, search_result,
+    party, document_party_role), so the round trips no longer grow with the row count.
+    If a doc_number appears more than once, the last row wins like the
+    row-at-a-time loader. Rows without a doc_number are stored but get no party roles.
+    """
+    doc_cols = [
+        "search_term", "doc_type", "recorded_date", "doc_number",
+        "book_vol_page", "legal_description", "source_county", "doc_link",
+        "doc_path", "abstract_num", "county", "survey_name",
+        "acres", "subdivision", "case_number", "misc_legal"
+    ]
+    col_list = ", ".join(doc_cols)
+
+    if not results_list:
+        return 0
+
+    start = time.time()
+    try:
+        with conn.cursor() as cur:
+            # Staging tables take their column types from the real table
+            cur.execute(f"""
+                CREATE TEMP TABLE stage_document_header ON COMMIT DROP AS
+                SELECT {col_list} FROM clerk.document_header WITH NO DATA;
+            """)
+            cur.execute("""
+                ALTER TABLE stage_document_header
+                    ADD COLUMN row_idx integer,
+                    ADD COLUMN grantor text,
+                    ADD COLUMN grantee text;
+            """)
+
+            # 1) COPY rows into staging
+            with cur.copy(f"COPY stage_document_header ({col_list}, row_idx, grantor, grantee) FROM STDIN") as copy:
+                for row_idx, row in enumerate(results_list):
+                    parties = []
+                    for role in ("grantor", "grantee"):
+                        name = row.get(role)
+                        parties.append(name.strip() if name and name.strip() else None)
+                    copy.write_row([row.get(c) for c in doc_cols] + [row_idx] + parties)
+
+            # 2) UPSERT documents, last row per (doc_number, source_county) wins,
+            #    and remember which search returned each of them
+            cur.execute(f"""
+                WITH upserted AS (
+                    INSERT INTO clerk.document_header ({col_list})
+                    SELECT DISTINCT ON (doc_number, source_county, CASE WHEN doc_number IS NULL THEN row_idx END)
+                        {col_list}
+                    FROM stage_document_header
+                    ORDER BY doc_number, source_county, CASE WHEN doc_number IS NULL THEN row_idx END, row_idx DESC
+                    ON CONFLICT (doc_number, source_county)
+                    DO UPDATE SET
+                        search_term     = EXCLUDED.search_term,
+                        doc_type        = EXCLUDED.doc_type,
+                        recorded_date   = EXCLUDED.recorded_date,
+                        book_vol_page   = EXCLUDED.book_vol_page,
+                        legal_description = EXCLUDED.legal_description,
+                        doc_link        = EXCLUDED.doc_link,
+                        doc_path        = COALESCE(EXCLUDED.doc_path, clerk.document_header.doc_path),
+                        abstract_num    = EXCLUDED.abstract_num,
+                        county          = EXCLUDED.county,
+                        survey_name     = EXCLUDED.survey_name,
+                        acres           = EXCLUDED.acres,
+                        subdivision     = EXCLUDED.subdivision,
+                        case_number     = EXCLUDED.case_number,
+                        misc_legal      = EXCLUDED.misc_legal,
+                        scraped_at      = NOW()
+                    RETURNING id, search_term, source_county
+                ), linked AS (
+                    INSERT INTO clerk.search_result (search_term, source_county, document_header_id)
+                    SELECT search_term, source_county, id
+                    FROM upserted
+                    WHERE search_term IS NOT NULL AND source_county IS NOT NULL
+                    ON CONFLICT DO NOTHING
                 )
+                SELECT count(*) FROM upserted;
+            """)
+            doc_count = cur.fetchone()[0]
+
+            # 3) Party names, one row per (document, role)
+            cur.execute("""
+                CREATE TEMP TABLE stage_party_role ON COMMIT DROP AS
+                SELECT DISTINCT s.doc_number, s.source_county, r.role, r.name
+                FROM stage_document_header s
+                CROSS JOIN LATERAL (VALUES ('grantor', s.grantor), ('grantee', s.grantee)) AS r(role, name)
+                WHERE r.name IS NOT NULL AND s.doc_number IS NOT NULL;
+            """)
+
+            # Insert only the names clerk.party doesn't have yet
+            cur.execute("""
+                INSERT INTO clerk.party (party_name)
+                SELECT DISTINCT sp.name
+                FROM stage_party_role sp
+                ON CONFLICT (party_name) DO NOTHING;
+            """)
+            party_count = cur.rowcount
+
+            # 4) Link party + doc
+            cur.execute("""
+                INSERT INTO clerk.document_party_role (document_header_id, party_id, role, original_name)
+                SELECT d.id, p.id, sp.role, sp.name
+                FROM stage_party_role sp
+                JOIN clerk.document_header d
+                  ON d.doc_number = sp.doc_number AND d.source_county = sp.source_county
+                JOIN (
+                    SELECT party_name, MIN(id) AS id
+                    FROM clerk.party
+                    WHERE party_name IN (SELECT name FROM stage_party_role)
+                    GROUP BY party_name
+                ) p ON p.party_name = sp.name
+                ON CONFLICT DO NOTHING;
+            """)
+            role_count = cur.rowcount
 
         conn.commit()
+    except Exception:
+        # Leave the (pooled) connection usable, like insert_search_table_results
+        conn.rollback()
+        raise
+    print(f"✅ Bulk loaded {doc_count} documents, {party_count} new parties, {role_count} roles in {time.time() - start:.2f}s")
+    return doc_count
 
 
 def check_search_term_exists(search_term, county, conn):
     """
-    Check if a search term already exists in the documents_header table for a given county code.
+    Check if a search term already exists in the document_header table for a given county code.
 
     Args:
         search_term: The search term to check.
@@ -104,16 +516,123 @@ def check_search_term_exists(search_term, county, conn):
         cur.execute("""
             SELECT EXISTS(
                 SELECT 1
-                FROM clerk.documents_header
+                FROM clerk.document_header
                 WHERE search_term = %s AND source_county = %s
             );
-        """, (search_term, county))
+        """, (search_term, county), prepare=True)
         return cur.fetchone()[0]
 
+def record_search(search_term, county, result_count, conn):
+    """Mark (search_term, county) as scraped now. Used by search_is_fresh."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO clerk.search_log (search_term, source_county, last_scraped_at, result_count)
+            VALUES (%s, %s, NOW(), %s)
+            ON CONFLICT (search_term, source_county)
+            DO UPDATE SET
+                last_scraped_at = EXCLUDED.last_scraped_at,
+                result_count    = EXCLUDED.result_count;
+        """, (search_term, county, result_count))
+    conn.commit()
+
+def get_search_watermark(search_term, county, conn):
+    """Return the newest recorded_date stored for (search_term, county), or None if it was never scraped."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT max_recorded_date
+            FROM clerk.search_log
+            WHERE search_term = %s AND source_county = %s;
+        """, (search_term, county), prepare=True)
+        row = cur.fetchone()
+    return row[0] if row else None
+
+def update_search_watermark(search_term, county, search_table, conn):
+    """Advance the (search_term, county) watermark to the newest recorded_date/doc_number in search_table."""
+    dated = [row for row in search_table if row.get("recorded_date")]
+    if not dated:
+        return
+    newest = max(dated, key=lambda row: (row["recorded_date"], row.get("doc_number") or ""))
+
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO clerk.search_log (search_term, source_county, max_recorded_date, max_doc_number)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (search_term, source_county)
+            DO UPDATE SET
+                max_doc_number = CASE
+                    WHEN clerk.search_log.max_recorded_date IS NULL
+                      OR (EXCLUDED.max_recorded_date, EXCLUDED.max_doc_number)
+                         > (clerk.search_log.max_recorded_date, clerk.search_log.max_doc_number)
+                    THEN EXCLUDED.max_doc_number
+                    ELSE clerk.search_log.max_doc_number END,
+                max_recorded_date = GREATEST(clerk.search_log.max_recorded_date, EXCLUDED.max_recorded_date);
+        """, (search_term, county, newest["recorded_date"], newest.get("doc_number")))
+    conn.commit()
+
+def search_is_fresh(search_term, county, conn, max_age_days):
+    """
+    True if (search_term, county) was scraped less than `max_age_days` ago,
+    i.e. the stored search table can be used instead of hitting the site.
+    """
+    if max_age_days is None:
+        return False
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT last_scraped_at > NOW() - make_interval(days => %s)
+            FROM clerk.search_log
+            WHERE search_term = %s AND source_county = %s;
+        """, (max_age_days, search_term, county), prepare=True)
+        row = cur.fetchone()
+    return bool(row and row[0])
+
+def get_search_term_headers(search_term, county, conn):
+    """
+    Rebuild a search table (same keys as get_search_results_table rows, plus doc_path)
+    for a search term already stored in the DB, with one joined query.
+    Multiple grantors/grantees of a document are joined one name per line.
+    """
+    with conn.cursor(row_factory=dict_row) as cur:
+        cur.execute("""
+            SELECT
+                string_agg(r.original_name, E'\\n' ORDER BY r.original_name)
+                    FILTER (WHERE r.role = 'grantor') AS grantor,
+                string_agg(r.original_name, E'\\n' ORDER BY r.original_name)
+                    FILTER (WHERE r.role = 'grantee') AS grantee,
+                d.doc_type, d.recorded_date, d.doc_number, d.book_vol_page,
+                d.legal_description, d.doc_link,
+                d.abstract_num, d.survey_name, d.acres, d.subdivision,
+                d.case_number, d.misc_legal,
+                s.search_term, d.source_county, d.doc_path
+            FROM clerk.search_result s
+            JOIN clerk.document_header d ON d.id = s.document_header_id
+            LEFT JOIN clerk.document_party_role r ON r.document_header_id = d.id
+            WHERE s.search_term = %s AND s.source_county = %s
+            GROUP BY d.id, s.search_term
+            ORDER BY d.recorded_date DESC NULLS LAST, d.doc_number;
+        """, (search_term, county), prepare=True)
+        search_table = cur.fetchall()
+
+    for row in search_table:
+        if row["acres"] is not None:
+            row["acres"] = float(row["acres"])
+
+    print(f"✅ Loaded {len(search_table)} stored results for {search_term} ({county})")
+    return search_table
+
+def update_document_path(doc_number, county, doc_path, content_hash, conn):
+    """Link a downloaded document (path in the document store + content hash) to its header row."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE clerk.document_header
+            SET doc_path = %s, content_hash = %s
+            WHERE doc_number = %s AND source_county = %s;
+        """, (doc_path, content_hash, doc_number, county), prepare=True)
+    conn.commit()
+
 def load_doc_paths_from_db_to_search_table(search_table, county, conn):
     """
     Given a search_table (list of dicts) and a county,
-    add 'doc_path' from clerk.documents_header if it exists in the DB.
+    add 'doc_path' from clerk.document_header if it exists in the DB.
     Keeps all original keys in each row.
     Used to determine if a document needs to be scraped or not.
     """
@@ -127,10 +646,10 @@ def load_doc_paths_from_db_to_search_table(search_table, county, conn):
     with conn.cursor() as cur:
         cur.execute("""
             SELECT doc_number, doc_path
-            FROM clerk.documents_header
+            FROM clerk.document_header
             WHERE source_county = %s
               AND doc_number = ANY(%s);
-        """, (county, doc_numbers))
+        """, (county, doc_numbers), prepare=True)
         db_rows = cur.fetchall()
 
     # Build lookup dictionary {doc_number: doc_path}
@@ -148,3 +667,110 @@ def load_doc_paths_from_db_to_search_table(search_table, county, conn):
 
     print(f"✅ Added 'doc_path' to {len(db_lookup)} matching records (total rows: {len(updated)}).")
     return updated
+
+
+def enqueue_documents(search_table, county, conn):
+    """
+    Add the documents of an ordered search table (rows with a `priority` from
+    transform.order_documents) to clerk.download_queue. Rows that already have a
+    doc_path are skipped. Re-queuing an unfinished document keeps its best priority
+    and gives failed documents a fresh set of attempts. Returns the number of queue
+    rows inserted or updated (documents already done aren't counted).
+    """
+    values = [
+        (row["doc_number"], county, row["doc_link"], row.get("priority") or 8, row.get("recorded_date"))
+        for row in search_table
+        if row.get("doc_number") and row.get("doc_link") and not row.get("doc_path")
+    ]
+    if not values:
+        return 0
+
+    queued = 0
+    with conn.cursor() as cur:
+        cur.executemany("""
+            INSERT INTO clerk.download_queue (doc_number, source_county, doc_link, priority, recorded_date)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (doc_number, source_county)
+            DO UPDATE SET
+                priority = LEAST(clerk.download_queue.priority, EXCLUDED.priority),
+                doc_link = EXCLUDED.doc_link,
+                -- give jobs that ran out of attempts another round
+                status = CASE WHEN clerk.download_queue.status = 'failed' THEN 'pending' ELSE clerk.download_queue.status END,
+                attempts = CASE WHEN clerk.download_queue.status = 'failed' THEN 0 ELSE clerk.download_queue.attempts END
+            WHERE clerk.download_queue.status <> 'done'
+            RETURNING id;
+        """, values, returning=True)
+        while True:
+            queued += len(cur.fetchall())
+            if not cur.nextset():
+                break
+    conn.commit()
+    print(f"📥 Queued {queued} documents for download ({len(values) - queued} already done)")
+    return queued
+
+def claim_download_job(worker_id, conn, stale_after_minutes=30, max_attempts=5):
+    """
+    Claim the next pending job (lowest priority number, newest first) for this worker.
+    Jobs left in_progress longer than stale_after_minutes (crashed worker) are claimed
+    again, unless they already used max_attempts; those are marked failed instead.
+    Returns a dict or None when nothing is ready.
+    """
+    with conn.cursor(row_factory=dict_row) as cur:
+        # A job whose worker keeps dying on it must not be retried forever
+        cur.execute("""
+            UPDATE clerk.download_queue
+            SET status = 'failed',
+                last_error = COALESCE(last_error || E'\\n', '') || 'claim by ' || COALESCE(claimed_by, '?') || ' went stale'
+            WHERE id IN (
+                SELECT id
+                FROM clerk.download_queue
+                WHERE status = 'in_progress' AND attempts >= %s
+                  AND claimed_at < NOW() - make_interval(mins => %s)
+                FOR UPDATE SKIP LOCKED
+            );
+        """, (max_attempts, stale_after_minutes), prepare=True)
+        cur.execute("""
+            UPDATE clerk.download_queue
+            SET status = 'in_progress', claimed_by = %s, claimed_at = NOW(), attempts = attempts + 1
+            WHERE id = (
+                SELECT id
+                FROM clerk.download_queue
+                WHERE (status = 'pending' AND next_attempt_at <= NOW())
+                   OR (status = 'in_progress' AND attempts < %s
+                       AND claimed_at < NOW() - make_interval(mins => %s))
+                ORDER BY priority, recorded_date DESC NULLS LAST, id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, doc_number, source_county, doc_link, attempts;
+        """, (worker_id, max_attempts, stale_after_minutes), prepare=True)
+        job = cur.fetchone()
+    conn.commit()
+    return job
+
+def complete_download_job(job_id, conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE clerk.download_queue
+            SET status = 'done', finished_at = NOW(), last_error = NULL
+            WHERE id = %s;
+        """, (job_id,), prepare=True)
+    conn.commit()
+
+def fail_download_job(job_id, error, conn, max_attempts=5):
+    """Put a failed job back with exponential backoff, or mark it failed after max_attempts."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE clerk.download_queue
+            SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                last_error = %s,
+                next_attempt_at = NOW() + make_interval(mins => power(2, attempts)::int)
+            WHERE id = %s;
+        """, (max_attempts, str(error)[:1000], job_id), prepare=True)
+    conn.commit()
+
+def download_queue_counts(conn):
+    """{status: count} for clerk.download_queue."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT status, COUNT(*) FROM clerk.download_queue GROUP BY status;")
+        return dict(cur.fetchall())
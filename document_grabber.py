@@ -0,0 +1,227 @@
+# Downloads the page images of a county clerk document.
+# The viewer is only used to learn each page's image url; the images themselves
+# are fetched concurrently over plain HTTP with the browser's cookies.
+
+# Standard library
+import base64
+import io
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+# Third-party packages
+import fitz  # PyMuPDF for PDF assembly
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+# Local imports
+import throttle
+
+# Reads the href of the page image shown in the document viewer
+page_image_href_js = """() => {
+    const img = document.querySelector("svg image");
+    return img ? (img.getAttribute("href") || img.getAttribute("xlink:href")) : null;
+}"""
+
+# Resolves once the viewer shows an image whose href differs from `previous`
+page_image_changed_js = """previous => {
+    const img = document.querySelector("svg image");
+    const href = img ? (img.getAttribute("href") || img.getAttribute("xlink:href")) : null;
+    return href && href !== previous;
+}"""
+
+# Fetches a blob:/same-origin url inside the page and returns it as a data: url
+fetch_as_data_url_js = """async url => {
+    const blob = await (await fetch(url)).blob();
+    return await new Promise(resolve => {
+        const reader = new FileReader();
+        reader.onload = () => resolve(reader.result);
+        reader.readAsDataURL(blob);
+    });
+}"""
+
+image_extensions = {"image/png": ".png", "image/jpeg": ".jpg", "image/jpg": ".jpg", "image/tiff": ".tif", "image/gif": ".gif", "image/webp": ".webp"}
+
+retry_statuses = {429, 500, 502, 503, 504}
+
+def download_image_href(page, href):
+    """Return (bytes, extension) of the original image behind an <image> href, fetched through the page."""
+    if href.startswith("blob:"):
+        href = page.evaluate(fetch_as_data_url_js, href)
+
+    if href.startswith("data:"):
+        header, encoded = href.split(",", 1)
+        content_type = header[5:].split(";")[0]
+        return base64.b64decode(encoded), image_extensions.get(content_type, ".png")
+
+    # Same cookies as the page, no rendering
+    response = page.context.request.get(urljoin(page.url, href))
+    if not response.ok:
+        raise RuntimeError(f"Image request failed with status {response.status}: {href}")
+    content_type = response.headers.get("content-type", "").split(";")[0].strip()
+    return response.body(), image_extensions.get(content_type, ".png")
+
+def collect_page_hrefs(page, page_input, total_pages):
+    """
+    Step the viewer through pages 1..total_pages and return each page's image href
+    (None where no image showed up). Only waits for the href to change, not for the image to load
+    (blob: images are read right away and returned as data: urls).
+    """
+    hrefs = []
+    previous_href = None
+    host_throttle = throttle.for_url(page.url)
+    for page_index in range(1, total_pages + 1):
+        try:
+            with host_throttle.request():
+                if page_index > 1:
+                    page_input.fill(str(page_index))
+                    page.evaluate("el => el.dispatchEvent(new Event('change', { bubbles: true }))", page_input)
+                page.wait_for_function(page_image_changed_js, arg=previous_href, timeout=30000)
+        except PlaywrightTimeoutError:
+            print(f"⚠️ No image found on page {page_index}")
+            hrefs.append(None)
+            continue
+
+        previous_href = page.evaluate(page_image_href_js)
+        if previous_href.startswith("blob:"):
+            # blob urls die when the viewer moves on, so read them now
+            hrefs.append(page.evaluate(fetch_as_data_url_js, previous_href))
+        else:
+            hrefs.append(previous_href)
+    return hrefs
+
+def session_from_context(context, pool_size):
+    """requests session carrying the browser context's cookies, pooled for `pool_size` threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+    for cookie in context.cookies():
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+    return session
+
+def fetch_with_retry(session, url, retries=4, backoff=1.0):
+    """
+    GET `url` at the host's adaptive rate (throttle.py), retrying connection errors,
+    timeouts and 429/5xx with exponential backoff + jitter. Other error statuses raise
+    requests.HTTPError right away. Returns (bytes, extension).
+    """
+    host_throttle = throttle.for_url(url)
+    for attempt in range(retries + 1):
+        host_throttle.acquire()
+        start = time.monotonic()
+        try:
+            response = session.get(url, timeout=60)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            host_throttle.record(time.monotonic() - start, error=True)
+            error = e
+        else:
+            host_throttle.record_response(response, time.monotonic() - start)
+            if response.status_code not in retry_statuses:
+                response.raise_for_status()  # 401/403/404 won't get better by retrying
+                content_type = response.headers.get("content-type", "").split(";")[0].strip()
+                return response.content, image_extensions.get(content_type, ".png")
+            error = f"status {response.status_code}"
+        if attempt == retries:
+            raise RuntimeError(f"Giving up on {url} after {retries + 1} tries: {error}")
+        delay = backoff * 2 ** attempt + random.uniform(0, backoff)
+        print(f"⚠️ {error} for {url}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+def save_page(image_bytes, extension, output_dir, page_index):
+    filepath = os.path.join(output_dir, f"page_{page_index}{extension}")
+    with open(filepath, "wb") as f:
+        f.write(image_bytes)
+    return filepath
+
+def fetch_page(session, url, output_dir, page_index, retries=4):
+    """Download one page image and write it to `output_dir`. Returns the file path."""
+    image_bytes, extension = fetch_with_retry(session, url, retries)
+    return save_page(image_bytes, extension, output_dir, page_index)
+
+def download_pages(page, hrefs, output_dir, max_workers=6, retries=4):
+    """
+    Download the page images in `hrefs` (from collect_page_hrefs) into `output_dir`,
+    up to `max_workers` at once. Returns the saved file paths in page order.
+    """
+    jobs = {}
+    files = {}
+    for page_index, href in enumerate(hrefs, start=1):
+        if not href:
+            continue
+        if href.startswith(("blob:", "data:")):
+            # Already in memory / only readable from inside the page
+            image_bytes, extension = download_image_href(page, href)
+            files[page_index] = save_page(image_bytes, extension, output_dir, page_index)
+        else:
+            jobs[page_index] = urljoin(page.url, href)
+
+    if jobs:
+        session = session_from_context(page.context, max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                page_index: pool.submit(fetch_page, session, url, output_dir, page_index, retries)
+                for page_index, url in jobs.items()
+            }
+            for page_index, future in futures.items():
+                files[page_index] = future.result()
+                print(f"✅ Saved page {page_index}")
+
+    return [files[page_index] for page_index in sorted(files)]
+
+def encode_page(path, compression, jpeg_quality):
+    """
+    Bytes to embed for one page image.
+    "original" passes the downloaded file through untouched, "gray" re-encodes
+    as a lossless 8-bit grayscale PNG, "jpeg" as a grayscale JPEG at jpeg_quality.
+    """
+    if compression == "original":
+        with open(path, "rb") as f:
+            return f.read()
+
+    buffer = io.BytesIO()
+    with Image.open(path) as img:
+        gray = img.convert("L")
+        if compression == "gray":
+            gray.save(buffer, format="PNG", optimize=True)
+        elif compression == "jpeg":
+            gray.save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
+        else:
+            raise ValueError(f"Unknown PDF compression: {compression}")
+    return buffer.getvalue()
+
+def assemble_pdf(image_files, pdf_path, compression="original", jpeg_quality=75, default_dpi=200):
+    """
+    Build `pdf_path` from page images one page at a time.
+
+    Each page is embedded from its encoded bytes (never held as decoded RGB)
+    and appended with an incremental save, and the document is reopened per
+    page, so memory stays around one page no matter how long the document is.
+    The PDF is written to a unique temp name next to `pdf_path` and renamed when complete.
+    """
+    tmp_path = f"{pdf_path}.{uuid.uuid4().hex}.part"  # unique so parallel writers never share it
+
+    for page_number, path in enumerate(image_files):
+        # Page size in points from the image's own DPI (only reads the header)
+        with Image.open(path) as img:
+            width, height = img.size
+            dpi_x, dpi_y = img.info.get("dpi", (default_dpi, default_dpi))
+        dpi_x, dpi_y = (dpi_x or default_dpi), (dpi_y or default_dpi)
+
+        doc = fitz.open(tmp_path) if page_number else fitz.open()
+        page = doc.new_page(width=width * 72 / dpi_x, height=height * 72 / dpi_y)
+        page.insert_image(page.rect, stream=encode_page(path, compression, jpeg_quality))
+        if page_number:
+            doc.save(tmp_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP, deflate=True)
+        else:
+            doc.save(tmp_path, deflate=True)
+        doc.close()
+
+    os.replace(tmp_path, pdf_path)
+    return pdf_path
@@ -0,0 +1,59 @@
+# Content-addressed storage for downloaded county clerk documents.
+# A document is stored once under the hash of its page images:
+#   county_clerk_docs/<county>/<hash[:2]>/<hash>.pdf
+# Each download works in its own temp directory and the finished PDF is renamed into place.
+
+# Standard library
+import hashlib
+import os
+import shutil
+import tempfile
+
+# Local imports
+import document_grabber
+
+base_dir = r"C:\Users\milom\Documents\landman\county_clerk_docs"
+
+def new_download_dir(county_name):
+    """Private temp directory for one download (on the same drive as the store so renames are atomic)."""
+    tmp_root = os.path.join(base_dir, county_name, ".tmp")
+    os.makedirs(tmp_root, exist_ok=True)
+    return tempfile.mkdtemp(prefix="download_", dir=tmp_root)
+
+def hash_page_files(image_files):
+    """sha256 over the page images in order (re-downloads of the same pages give the same hash)."""
+    digest = hashlib.sha256()
+    for path in image_files:
+        page_digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                page_digest.update(chunk)
+        digest.update(page_digest.digest())
+    return digest.hexdigest()
+
+def stored_path(county_name, content_hash):
+    return os.path.join(base_dir, county_name, content_hash[:2], f"{content_hash}.pdf")
+
+def content_hash_from_path(doc_path):
+    """The content hash is the stored file's name."""
+    return os.path.splitext(os.path.basename(doc_path))[0] if doc_path else None
+
+def store_document(image_files, county_name, compression="original"):
+    """
+    Store the PDF for these page images unless identical pages are already stored.
+    Returns (path relative to base_dir, content hash).
+    """
+    content_hash = hash_page_files(image_files)
+    pdf_path = stored_path(county_name, content_hash)
+
+    if os.path.exists(pdf_path):
+        print(f"♻️ Identical document already stored at {pdf_path}")
+    else:
+        os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
+        document_grabber.assemble_pdf(image_files, pdf_path, compression=compression)
+        print(f"📄 Combined {len(image_files)} pages into {pdf_path}")
+
+    return os.path.relpath(pdf_path, base_dir), content_hash
+
+def remove_download_dir(download_dir):
+    shutil.rmtree(download_dir, ignore_errors=True)
@@ -0,0 +1,116 @@
+# Drains the clerk.download_queue table (filled by dbutils.enqueue_documents).
+# Each worker process claims one job at a time with FOR UPDATE SKIP LOCKED, so any
+# number of workers (or machines) can share the queue and a crash only loses the
+# job in hand, which is claimed again once it goes stale.
+
+# Standard library
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+
+# Third-party packages
+from playwright.sync_api import sync_playwright
+
+# Local imports
+import browser_contexts
+import dbutils
+import document_store
+import scraper_functions
+import throttle
+
+def drain_queue(page, conn, worker_id, max_jobs=None, idle_exit=True, poll_seconds=30,
+                mode="image", pdf_compression="original", max_attempts=5):
+    """
+    Claim and download jobs with an already open page and DB connection until the
+    queue is empty (or `max_jobs` are done). With idle_exit=False it keeps polling
+    every `poll_seconds` for new or retryable jobs. Returns the number of jobs handled.
+    """
+    handled = 0
+    while max_jobs is None or handled < max_jobs:
+        job = dbutils.claim_download_job(worker_id, conn, max_attempts=max_attempts)
+        if job is None:
+            if idle_exit:
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        handled += 1
+        try:
+            doc_paths = scraper_functions.get_document(
+                job["doc_link"], job["doc_number"], job["source_county"], page,
+                mode=mode, pdf_compression=pdf_compression,
+            )
+            if not doc_paths:
+                raise RuntimeError("no pages downloaded")
+            dbutils.update_document_path(
+                job["doc_number"], job["source_county"], doc_paths[0],
+                document_store.content_hash_from_path(doc_paths[0]), conn,
+            )
+            dbutils.complete_download_job(job["id"], conn)
+            print(f"✅ [{worker_id}] {job['source_county']} {job['doc_number']} -> {doc_paths[0]}")
+        except Exception as e:
+            conn.rollback()
+            dbutils.fail_download_job(job["id"], e, conn, max_attempts=max_attempts)
+            print(f"⚠️ [{worker_id}] {job['doc_number']} failed (attempt {job['attempts']}): {e}")
+    return handled
+
+def run_worker(worker_number=0, max_jobs=None, idle_exit=True, headless=True,
+               mode="image", pdf_compression="original", worker_count=1):
+    """
+    One worker process: its own browser, page and DB connection (schema must already exist).
+    Its host throttles get 1/worker_count of each county's request budget.
+    """
+    throttle.set_process_count(worker_count)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{worker_number}"
+    conn = dbutils.connect()
+    try:
+        with sync_playwright() as p:
+            browser = browser_contexts.launch_browser(p, headless=headless)
+            page = browser_contexts.new_scraping_context(browser, "document").new_page()
+            handled = drain_queue(page, conn, worker_id, max_jobs=max_jobs, idle_exit=idle_exit,
+                                  mode=mode, pdf_compression=pdf_compression)
+            browser.close()
+        print(f"🏁 [{worker_id}] handled {handled} jobs")
+    finally:
+        conn.close()
+
+def run_workers(workers=4, **kwargs):
+    """Start `workers` worker processes and wait for them to finish."""
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(i,), kwargs={**kwargs, "worker_count": workers},
+                                name=f"download-worker-{i}")
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    # Usage: python download_worker.py --workers 4 [--forever]
+    parser = argparse.ArgumentParser(description="Download queued county clerk documents.")
+    parser.add_argument("--workers", type=int, default=4, help="worker processes to run")
+    parser.add_argument("--max-jobs", type=int, default=None, help="stop each worker after this many jobs")
+    parser.add_argument("--forever", action="store_true", help="keep polling when the queue is empty")
+    parser.add_argument("--mode", choices=("image", "screenshot"), default="image")
+    parser.add_argument("--pdf-compression", choices=("original", "gray", "jpeg"), default="original")
+    parser.add_argument("--show-browser", action="store_true")
+    args = parser.parse_args()
+
+    conn = dbutils.connect()
+    try:
+        dbutils.ensure_schema(conn)
+        print(f"Download queue: {dbutils.download_queue_counts(conn)}")
+    finally:
+        conn.close()
+
+    run_workers(
+        args.workers,
+        max_jobs=args.max_jobs,
+        idle_exit=not args.forever,
+        headless=not args.show_browser,
+        mode=args.mode,
+        pdf_compression=args.pdf_compression,
+    )
@@ -0,0 +1,180 @@
+# Plain HTTP client for the JSON search backend behind GovOS *.tx.publicsearch.us sites.
+# Produces the same row cells as the Playwright scraper without starting a browser.
+# The response is parsed against one fixed shape (see hit_fields); anything else raises
+# UnexpectedResponse instead of quietly producing empty rows. To capture a response for
+# tests/fixtures: python govos_api.py https://freestone.tx.publicsearch.us/ "Emma Stone" out.json
+
+# Standard library
+import argparse
+import json
+import time
+from datetime import datetime
+
+# Third-party packages
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Local imports
+import throttle
+
+search_endpoint = "api/search"
+page_size = 250  # hits requested per call
+
+# Response shape: {"hits": {"total": {"value": N}, "hits": [{"_id": .., "_source": {..}}]}}
+# Key in a hit's _source for each results table column (book_vol_page is built from book_parts)
+hit_fields = {
+    "grantor": "grantors",
+    "grantee": "grantees",
+    "doc_type": "docType",
+    "recorded_date": "recordedDate",
+    "doc_number": "docNumber",
+    "legal_description": "legalDescriptions",
+}
+book_parts = ("bookType", "volume", "page")  # joined like "OR/781/87"
+required_keys = ("docType", "recordedDate", "docNumber")  # every hit has these, or the schema changed
+columns = ["grantor", "grantee", "doc_type", "recorded_date", "doc_number", "book_vol_page", "legal_description"]
+
+class UnexpectedResponse(ValueError):
+    """The search backend answered with a shape this module doesn't know."""
+
+_session = None
+
+def get_session(pool_size=10):
+    """Return the shared requests session (keep-alive pool + retries on 429/5xx), creating it on first use."""
+    global _session
+    if _session is None:
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        _session = requests.Session()
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+        _session.headers.update({
+            "Accept": "application/json",
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+        })
+    return _session
+
+def _field(source, key):
+    """Text of `source[key]` (None if empty); lists are joined one name per line."""
+    value = source.get(key)
+    if value in (None, "", []):
+        return None
+    if isinstance(value, list):
+        return "\n".join(str(v).strip() for v in value if v)
+    return str(value).strip()
+
+def _format_recorded_date(value):
+    """Normalize an API date to the MM/DD/YYYY text the results table shows."""
+    if not value:
+        return None
+    for fmt in ("%m/%d/%Y", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%m/%d/%Y")
+        except ValueError:
+            continue
+    return value
+
+def hit_to_cells(hit):
+    """Convert one search hit into ([7 result table cells], doc_id). Raises UnexpectedResponse on an unknown shape."""
+    source = hit.get("_source") if isinstance(hit, dict) else None
+    if not isinstance(source, dict) or not hit.get("_id"):
+        raise UnexpectedResponse(f"Search hit without _id/_source: {json.dumps(hit, default=str)[:300]}")
+    missing = [key for key in required_keys if key not in source]
+    if missing:
+        raise UnexpectedResponse(f"Search hit {hit['_id']} is missing {missing}, has {sorted(source)}")
+
+    cells = {column: _field(source, key) for column, key in hit_fields.items()}
+    cells["recorded_date"] = _format_recorded_date(cells["recorded_date"])
+    parts = [_field(source, key) for key in book_parts]
+    cells["book_vol_page"] = "/".join(parts) if all(parts) else None
+
+    return [cells[column] for column in columns], str(hit["_id"])
+
+def _hits_and_total(payload):
+    """Pull the hit list and total hit count (None if not reported) out of a search response."""
+    hits = payload.get("hits") if isinstance(payload, dict) else None
+    if not isinstance(hits, dict) or not isinstance(hits.get("hits"), list):
+        keys = sorted(payload) if isinstance(payload, dict) else type(payload).__name__
+        raise UnexpectedResponse(f"Search response has no hits.hits list (got {keys})")
+    total = hits.get("total")
+    if isinstance(total, dict):
+        total = total.get("value")
+    return hits["hits"], total
+
+def search_results(search, county_link, department="RP", session=None, recorded_date_range=None):
+    """
+    Yield (cells, doc_id) for every hit of `search` on a GovOS county site,
+    paging through the JSON backend with limit/offset until it runs out.
+    recorded_date_range ("YYYYMMDD,YYYYMMDD") limits hits to that recorded date window.
+    """
+    session = session or get_session()
+    url = f"{county_link.rstrip('/')}/{search_endpoint}"
+    host_throttle = throttle.for_url(url)
+    offset = 0
+
+    #---- Page loop ----
+    while True:
+        params = {
+            "department": department,
+            "limit": page_size,
+            "offset": offset,
+            "searchOcrText": "false",
+            "searchType": "quickSearch",
+            "searchValue": search,
+        }
+        if recorded_date_range:
+            params["recordedDateRange"] = recorded_date_range
+        host_throttle.acquire()
+        start = time.monotonic()
+        try:
+            response = session.get(url, params=params, timeout=30)
+        except requests.RequestException:
+            host_throttle.record(time.monotonic() - start, error=True)
+            raise
+        host_throttle.record_response(response, time.monotonic() - start)
+        response.raise_for_status()
+        hits, total = _hits_and_total(response.json())
+
+        for hit in hits:
+            yield hit_to_cells(hit)
+
+        offset += len(hits)
+        print(f"Fetched {offset}{f'/{total}' if total else ''} results")
+
+        # Trust the reported total when there is one: the server may cap pages below page_size
+        if not hits or (total is not None and offset >= total):
+            break
+        if total is None and len(hits) < page_size:
+            break
+
+def save_search_response(county_link, search, path, limit=25, department="RP"):
+    """Save the raw JSON of one search page to `path` (for tests/fixtures)."""
+    url = f"{county_link.rstrip('/')}/{search_endpoint}"
+    params = {
+        "department": department,
+        "limit": limit,
+        "offset": 0,
+        "searchOcrText": "false",
+        "searchType": "quickSearch",
+        "searchValue": search,
+    }
+    response = get_session().get(url, params=params, timeout=30)
+    response.raise_for_status()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(response.json(), f, indent=2)
+    print(f"Saved {search} search response from {county_link} to {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record a GovOS search response as a test fixture.")
+    parser.add_argument("county_link")
+    parser.add_argument("search")
+    parser.add_argument("path")
+    parser.add_argument("--limit", type=int, default=25)
+    args = parser.parse_args()
+    save_search_response(args.county_link, args.search, args.path, args.limit)
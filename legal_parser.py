@@ -0,0 +1,286 @@
+# Parses county clerk legal description strings into abstract number, survey name,
+# acreage, subdivision, case number and misc legal text.
+# All patterns are compiled once at import; the pattern lists are tried in order
+# (first pattern that matches wins) exactly like the original per-row parser.
+
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+class LegalDescription(NamedTuple):
+    abstract_num: Optional[str] = None
+    survey_name: Optional[str] = None
+    acres: Optional[float] = None
+    subdivision: Optional[str] = None
+    case_number: Optional[str] = None
+    misc_legal: Optional[str] = None
+
+EMPTY = LegalDescription()
+
+# Bump whenever parsing results change so saved parse caches (ParseCache.save) are discarded
+PARSER_VERSION = 1
+
+# Define regex patterns
+abs_patterns = [re.compile(p) for p in [
+    r'AB#\d+',
+    r'A-\d+',
+    r'Survey: \d+'
+]]
+survey_league_pattern = re.compile(r'.*LEAGUE')
+# Only tried when there is no abstract number or acreage (otherwise the whole remainder is the survey name)
+survey_patterns = [re.compile(p) for p in [
+    r'.*SUR',
+    r'.*GRANT',
+    r'Survey- Name: .*'
+]]
+unwanted_survey_phrases = [
+    'Survey- Name: ',
+    'Survey Name: ',
+    'Survey-',
+    'Survey -',
+    'GRANT',
+    'SURVEY',
+    'SUR',
+    'LEAGUE',
+    'Name: '
+]
+acreage_patterns = [re.compile(p, re.IGNORECASE) for p in [
+    # --- Decimals (with parentheses) ---
+    r'\(\d+\.\d+\s*ACRES\)',             # (5.44 ACRES), 5.44 ACS
+    r'\(\.\d+\s*ACRES\)',                # (.5 ACRES), (.5 ACS)
+    r'\(\d+\.\d+\s*ACS\)',             # (5.44 ACRES), 5.44 ACS
+    r'\(\.\d+\s*ACS\)',                # (.5 ACRES), (.5 ACS)
+    # --- Decimals (without parentheses) ---
+    r'\d*\.\d+\s*ACRES',             # (5.44 ACRES), 5.44 ACS
+    r'\.\d+\s*ACRES',                # (.5 ACRES), (.5 ACS)
+    r'\d*\.\d+\s*ACS',             # (5.44 ACRES), 5.44 ACS
+    r'\.\d+\s*ACS',                # (.5 ACRES), (.5 ACS)
+    # --- Mixed numbers (whole + fraction) ---
+    r'\(\d+\s+\d+/\d+\s*ACRES\)',        # (1 1/2 ACRES), 1 1/2 ACS
+    r'\d+\s+\d+/\d+\s*ACRES',
+    # --- Pure fractions ---
+    r'\(\d+/\d+\s*ACRES\)',              # (1/5 ACRES), 1/5 ACS
+    r'\d+/\d+\s*ACRES',
+    # --- Whole numbers ---
+    r'\(PT \d*\.?\d+ ACRES\)', # (PT 5.44 ACRES)
+    r'\(\d+\s*ACRES\)',
+    r'\d+\s*ACRES',                  # (5 ACRES), 5 ACS
+    r'\d+ ACS',
+    # --- Labelled or unusual formatting ---
+    r'Acres?:\s*\d*\.?\d+', # Acres: 54.2 Acres: .96
+    r'Acres: \d'
+]]
+# Any match means "subdivision", so these are combined into one alternation
+subdivision_pattern = re.compile('|'.join(f'(?:{p})' for p in [
+    r'L-\w+ (?:\b\w+\b\s+)*ADDN',
+    r'ADDN \d \d{5} \d{5} \d{3}[A-Z]',
+    r'ADDN \d{5} \d{5} \d{3}[A-Z]',
+    r'ADDN \d+',
+    r'SUBD LOT \d+',
+    r'SUBD \d+',
+    r'\d{5} \d{4} \d{4}[A-Z] \d{4}',
+    r'\d{5} \d{5} \d{4}',
+    r'\d{5} \d{5} \d{3}[A-Z]',
+    r'L-\w+ (?:\b\w+\b\s+)*',
+    r'\w+ \d{5}',
+    r'Subdivision\s?-'
+]), re.IGNORECASE)
+misc_legal_pattern = re.compile(r'MULTIPLE TRACTS SEE INSTRUMENT|N/A', re.IGNORECASE)
+
+# acres_string_to_float patterns
+_acre_cleanup = re.compile(r'[^0-9./\s]')
+_acre_mixed = re.compile(r'^\d+\s+\d+/\d+$')
+_acre_fraction = re.compile(r'^\d+/\d+$')
+_acre_decimal = re.compile(r'^\d*\.\d+$')
+_acre_whole = re.compile(r'^\d+$')
+_digits = re.compile(r'\d+')
+_non_digits = re.compile(r'\D')
+
+def acres_string_to_float(acreage_str):
+    """Convert a string like '1 1/2', '1/5', '40', or '.5' into a float."""
+    if not acreage_str or not isinstance(acreage_str, str):
+        return None
+
+    # Remove all characters except digits, dot, slash, and space
+    cleaned = _acre_cleanup.sub('', acreage_str).strip()
+
+    # Mixed number (e.g. '1 1/2')
+    if _acre_mixed.match(cleaned):
+        whole, num, den = map(float, _digits.findall(cleaned))
+        return round(whole + num / den, 6)
+
+    # Pure fraction (e.g. '1/5')
+    if _acre_fraction.match(cleaned):
+        num, den = map(float, _digits.findall(cleaned))
+        return round(num / den, 6)
+
+    # Decimal (e.g. '.5', '5.44')
+    if _acre_decimal.match(cleaned):
+        return round(float(cleaned), 6)
+
+    # Whole number (e.g. '40')
+    if _acre_whole.match(cleaned):
+        return round(float(cleaned), 6)
+
+    # If none of the above matched, return None
+    print('failed to convert string')
+    return None
+
+def _first_match(patterns, text):
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return match
+    return None
+
+def parse_legal_description_uncached(legal_desc, doc_type):
+    """Extracts survey name and abs number from a single legal description string. Returns a LegalDescription."""
+    if not isinstance(legal_desc, str):
+        return EMPTY
+
+    if doc_type == 'ABSTRACT JUDGEMT':
+        return LegalDescription(case_number=legal_desc.strip())
+
+    #Checks for undescriptive legal descriptions to return as misc_legal
+    if misc_legal_pattern.search(legal_desc):
+        return LegalDescription(misc_legal=legal_desc.strip())
+
+    abs_num = None
+    survey_name = None
+    acres = None
+
+    #Extract Columns from legal description---------------------
+    # ABS Number
+    match = _first_match(abs_patterns, legal_desc)
+    if match:
+        abs_num = match.group(0)
+        legal_desc = legal_desc.replace(abs_num, '').strip()
+        # keep only digits from the match
+        abs_num = _non_digits.sub('', abs_num)
+
+    #Numeric value of Acreage
+    match = _first_match(acreage_patterns, legal_desc)
+    if match:
+        acreage_str = match.group(0)
+        legal_desc = legal_desc.replace(acreage_str, '').strip()
+        acres = acres_string_to_float(acreage_str)
+
+    #Subdivision
+    if subdivision_pattern.search(legal_desc):
+        return LegalDescription(abs_num, None, acres, legal_desc)
+
+    # Survey Name
+    match = survey_league_pattern.search(legal_desc)
+    if match:
+        survey_name = match.group(0)
+        legal_desc = legal_desc.replace(survey_name, '').strip()
+    elif abs_num or acres:
+        # whatever is left next to an abstract number / acreage is the survey name
+        survey_name = legal_desc.strip()
+        legal_desc = ''
+    else:
+        match = _first_match(survey_patterns, legal_desc)
+        if match:
+            survey_name = match.group(0)
+            legal_desc = legal_desc.replace(survey_name, '').strip()
+
+    misc_legal = legal_desc.strip()
+    if survey_name:
+        for phrase in unwanted_survey_phrases:
+            if phrase in survey_name:
+                survey_name = survey_name.replace(phrase, "")
+                misc_legal += f" st: {phrase}"
+        survey_name = survey_name.strip()
+
+    return LegalDescription(abs_num, survey_name or None, acres, None, None, misc_legal or None)
+
+class ParseCache:
+    """
+    Bounded LRU cache of (legal_desc, doc_type) -> LegalDescription with hit/miss counters.
+    Can be saved to / loaded from a JSON file so reparse runs start warm;
+    a file written by a different PARSER_VERSION is ignored.
+    """
+
+    def __init__(self, maxsize=200_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def parse(self, legal_desc, doc_type):
+        key = (legal_desc, doc_type)
+        result = self._entries.get(key)
+        if result is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return result
+
+        self.misses += 1
+        result = parse_legal_description_uncached(legal_desc, doc_type)
+        self._entries[key] = result
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)  # drop least recently used
+        return result
+
+    def info(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def save(self, path):
+        """Write the cached entries (oldest first) to a JSON file."""
+        entries = [[legal_desc, doc_type, list(result)] for (legal_desc, doc_type), result in self._entries.items()]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"parser_version": PARSER_VERSION, "entries": entries}, f)
+        os.replace(tmp_path, path)
+        print(f"💾 Saved {len(entries)} parsed legal descriptions to {path}")
+
+    def load(self, path):
+        """
+        Add entries from a file written by save(). Does nothing if the file doesn't exist
+        or was written by another parser version (those parses may be stale).
+        """
+        if not os.path.isfile(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        version = saved.get("parser_version") if isinstance(saved, dict) else None
+        if version != PARSER_VERSION:
+            print(f"♻️ Discarding parse cache {path} (parser version {version}, current {PARSER_VERSION})")
+            return
+        entries = saved["entries"]
+        for legal_desc, doc_type, result in entries[-self.maxsize:]:
+            self._entries[(legal_desc, doc_type)] = LegalDescription(*result)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        print(f"📂 Loaded {len(entries)} parsed legal descriptions from {path}")
+
+parse_cache = ParseCache()
+
+def parse_legal_description(legal_desc, doc_type):
+    """Cached parse_legal_description_uncached; see parse_cache.info() for hit/miss counts."""
+    try:
+        return parse_cache.parse(legal_desc, doc_type)
+    except TypeError:  # unhashable input, parse it directly
+        return parse_legal_description_uncached(legal_desc, doc_type)
+
+def parse_legal_descriptions(legal_descs, doc_types):
+    """
+    Parse a batch of legal descriptions (paired with their doc types).
+    Returns a list of LegalDescription; pd.DataFrame(result) gives one column per field.
+    """
+    parse = parse_legal_description
+    return [parse(legal_desc, doc_type) for legal_desc, doc_type in zip(legal_descs, doc_types)]
@@ -5,7 +5,6 @@ import random
 import sys
 import time
 from datetime import datetime
-import fuzzywuzzy as fuzz
 
 # Third-party packages
 import pandas as pd
@@ -14,91 +13,129 @@ from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
 
 # Local imports
+import browser_contexts
 import dbutils
+import download_worker
+import legal_parser
 import scraper_functions
+import survey_index
 import transform  
 
-def main(county_name, search_term, target_abstract_number):
+counties = {
+    "Freestone": {"code": "081", "link": "https://freestone.tx.publicsearch.us/", "host": "GovOS", "cache_ttl_days": 7},
+    "Anderson": {"code": "001", "link": "https://anderson.tx.publicsearch.us/", "host": "GovOS", "cache_ttl_days": 7},
+}
+
+def main(county_name, search_term, target_abstract_number, target_survey_name=None):
     #options 
     test_mode=True      #whether to run in test mode or not
 
-    refresh_searches=True  #whether to use old searches from db or not
-    #True ubtil you build get_search_term_headers function
+    refresh_searches=False  #True to always re-scrape, False to reuse stored searches newer than the county's cache_ttl_days
+    incremental_searches=True  #when re-scraping a stored search, only fetch documents recorded since its watermark
 
     save_searches=True     #whether to save new searches to db
+    bulk_load=True         #COPY search tables into the db instead of row-by-row inserts
 
     grab_documents=False   #whether to grab documents or not
+    document_mode="image"  #"image" saves the original page images, "screenshot" renders + screenshots each page
+    pdf_compression="original"  #"original" embeds page images as downloaded, "gray" lossless grayscale, "jpeg" smallest
+    drain_download_queue=True  #download queued documents in this run (False to only queue them for download_worker.py)
 
-    #Set Variables
-    counties = {
-        "Freestone": {"code": "081", "link": "https://freestone.tx.publicsearch.us/", "host": "GovOS"},
-        "Anderson": {"code": "001", "link": "https://anderson.tx.publicsearch.us/", "host": "GovOS"},
-    }
+    search_backend="playwright"  #"playwright" (browser) or "api" (GovOS JSON search over HTTP)
 
+    parallel_pages=True    #whether to fetch search result pages concurrently
+    max_page_tabs=4        #max tabs used at once when parallel_pages is on
 
+    parse_cache_path=r"C:\Users\milom\Documents\landman\legal_parse_cache.json"  #warm start for legal description parsing (None to disable)
+    use_survey_index=True  #match survey names against the county's surv???p.shp survey names when ordering documents
 
+    #Set Variables
     county_code=counties[county_name]["code"]
     county_link=counties[county_name]["link"]
 
-    #Load environment variables
-    #DB_NAME, DB_USER, DB_PASSWORD
-    load_dotenv(dotenv_path=r"C:\Users\milom\Documents\landman\.env")
-
-    conn = psycopg.connect(
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT"),
-    )
-
-        # Launch Playwright once
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-
-        # Each function gets its own page for isolation
-        page1 = context.new_page()
-
-        #get all associated headders for search term from DB or scrape new
-        #look if search term already exists in DB
-        if refresh_searches: # or not dbutils.check_search_term_exists(search_term, county_name, conn): #will always be true until you build get_search_term_headers function
-            search_table=scraper_functions.get_search_results_table(search_term, county_name, county_link, page1)
-            if save_searches:
-                dbutils.insert_search_table_results(search_table, conn)
-        else: #ignore until you build get_search_term_headers function 
-            search_table=dbutils.get_search_term_headers(search_term, county_name, conn) 
-
-        search_table = transform.order_documents(search_table, target_abstract_number)
-        
-        #display search_table
-        df_search_table=pd.DataFrame(search_table)
-        print(df_search_table)
+    if parse_cache_path:
+        legal_parser.parse_cache.load(parse_cache_path)
+
+    pool = dbutils.get_pool()
+    conn = pool.getconn()
+    try:
+        dbutils.ensure_schema(conn)
+
+            # Launch Playwright once
+        with sync_playwright() as p:
+            browser = browser_contexts.launch_browser(p, headless=True)
+            # Search pages skip images/fonts/trackers; the document context keeps images for the viewer
+            context = browser_contexts.new_scraping_context(browser, "search")
+
+            # Each function gets its own page for isolation
+            page1 = context.new_page()
+
+            #get all associated headders for search term from DB or scrape new
+            #look if search term was scraped recently enough to reuse
+            use_stored = not refresh_searches and dbutils.search_is_fresh(
+                search_term, county_name, conn, counties[county_name].get("cache_ttl_days")
+            )
+            if not use_stored:
+                since = None
+                if incremental_searches and save_searches:
+                    since = dbutils.get_search_watermark(search_term, county_name, conn)
+                search_table=scraper_functions.get_search_results_table(
+                    search_term, county_name, county_link, page1,
+                    parallel=parallel_pages, max_concurrency=max_page_tabs, backend=search_backend,
+                    since=since,
+                )
+                if save_searches and bulk_load:
+                    dbutils.bulk_insert_search_table_results(search_table, conn)
+                elif save_searches:
+                    dbutils.insert_search_table_results(search_table, conn)
+                if save_searches:
+                    dbutils.record_search(search_term, county_name, len(search_table), conn)
+                    dbutils.update_search_watermark(search_term, county_name, search_table, conn)
+                if since:
+                    # Only new documents were scraped, the full table comes from the DB
+                    search_table=dbutils.get_search_term_headers(search_term, county_name, conn)
+            else:
+                search_table=dbutils.get_search_term_headers(search_term, county_name, conn) 
+
+            #order & filter documents (assigns each row's download priority)
+            county_surveys = survey_index.load_county_index(county_name) if use_survey_index else None
+            search_table = transform.order_documents(
+                search_table, target_abstract_number, target_survey_name, survey_index=county_surveys,
+            )
         
-        #order & filter documents
-        search_table=transform.filter_documents(search_table, None, None)
-        search_table=transform.order_documents_df(search_table, target_abstract_number, target_survey_name)
-
-        if test_mode:
-            #save to csv for review
-            df_search_table.to_csv(r"C:\Users\milom\Documents\landman\search_table.csv", index=False)
-
-        if grab_documents:
-            #Scrape document for each header in search_table if not already in DB
-            search_table = dbutils.load_doc_paths_from_db_to_search_table(search_table, county_name, conn)
-            #Get documents from links
-            page2 = context.new_page()
-
-            #for each row find doc_path if none
-            for row in search_table:
-                if not row.get("doc_path"):
-                    doc_path = scraper_functions.get_document({"doc_link": row["doc_link"]}, county_name, page2)
-                    row["doc_path"]=doc_path
-                break #remove after testing one document
-
-        browser.close()
-
-    conn.close()
+            #display search_table
+            df_search_table=pd.DataFrame(search_table)
+            print(df_search_table)
+
+            if test_mode:
+                #save to csv for review
+                df_search_table.to_csv(r"C:\Users\milom\Documents\landman\search_table.csv", index=False)
+
+            if grab_documents:
+                #Queue every document not already in the DB, best priority first (see download_worker.py)
+                search_table = dbutils.load_doc_paths_from_db_to_search_table(search_table, county_name, conn)
+                dbutils.enqueue_documents(search_table, county_name, conn)
+
+                if drain_download_queue:
+                    #Download here with this browser; bigger backlogs: python download_worker.py --workers N
+                    page2 = browser_contexts.new_scraping_context(browser, "document").new_page()
+                    download_worker.drain_queue(
+                        page2, conn, f"main:{os.getpid()}",
+                        max_jobs=1 if test_mode else None,
+                        mode=document_mode, pdf_compression=pdf_compression,
+                    )
+                print(f"Download queue: {dbutils.download_queue_counts(conn)}")
+
+            browser.close()
+    finally:
+        # Hand the connection back clean and keep this run's parses even if the run failed
+        conn.rollback()
+        pool.putconn(conn)
+        dbutils.close_pool()
+
+        if parse_cache_path:
+            print(f"Legal description parse cache: {legal_parser.parse_cache.info()}")
+            legal_parser.parse_cache.save(parse_cache_path)
 
 if __name__ == "__main__":
     county_name="Freestone"
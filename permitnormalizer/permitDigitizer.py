@@ -1,29 +1,34 @@
 # This script extracts data from a folder of PDF files containing permit information and processes it into a structured format.
 
+import argparse
 import logging
 import os
 import re
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 import fitz  # PyMuPDF for PDF manipulation
 import pandas as pd
 import pdfplumber
-import pytesseract
 from PIL import Image
-from pdf2image import convert_from_path
+
+import permit_manifest
+import plat_ocr
 
 # Suppress verbose pdfplumber warnings
 logging.getLogger("pdfminer").setLevel(logging.ERROR)
-start = time.time()
 
 
-Replace=True
+# Bump when extraction changes so every file is re-extracted on the next run
+extractor_version = "3"
 
 #Paths
 input_folder_path = r"C:\Users\milom\Documents\landman\permitnormalizer\PDFinput"
-permit_csv_path = r"C:\Users\milom\Documents\landman\permitnormalizer\output/permit_data.csv"
-field_csv_path = r"C:\Users\milom\Documents\landman\permitnormalizer\output\field_data.csv"
-plat_csv_path = r"C:\Users\milom\Documents\landman\permitnormalizer\output/plat_data.csv"
+output_folder_path = r"C:\Users\milom\Documents\landman\permitnormalizer\output"
+permit_csv_name = "permit_data.csv"
+field_csv_name = "field_data.csv"
+plat_csv_name = "plat_data.csv"
+manifest_name = "manifest.sqlite"  #processed files + extracted rows
 
 #setting up data frames and thier columns
 columns = [
@@ -86,6 +91,7 @@ columns = [
 ]
 
 fieldcolumns = [
+    "API Number",#
     "RRC District No.",#
     "Field No.",#
     "Field Name",#
@@ -103,14 +109,6 @@ platcolumns = [
     "contents"
 ]
 
-# Create empty DataFrames with the specified columns
-permit_df= pd.DataFrame(columns=columns)
-field_df = pd.DataFrame(columns=fieldcolumns)
-plat_df = pd.DataFrame(columns=platcolumns)
-
-
-
-
 def extract_data_from_pdf(file_path):
     # Initialize a dictionary to hold the extracted data
     data = {col: "" for col in columns}
@@ -246,7 +244,7 @@ def extract_data_from_pdf(file_path):
             #---Field information---
             fields = []
             bottomhole_row = None  # will record the row index
-            permit_fields_df = pd.DataFrame(columns=fieldcolumns)
+            field_rows = []
 
             y = 16
             while y < len(table):
@@ -261,6 +259,7 @@ def extract_data_from_pdf(file_path):
                 if row[0] not in ["", None]:
                     #add_field(row)
                     field_data = {col: "" for col in fieldcolumns}
+                    field_data['API Number'] = data["API Number"]
                     field_data['RRC District No.'] = row[0].strip() 
                     field_data['Field No.'] = row[1].strip()
                     field_data['Field Name'] = row[4].strip() 
@@ -268,7 +267,7 @@ def extract_data_from_pdf(file_path):
                     field_data['Completion Depth'] = row[14].strip() 
                     field_data['Distance to Nearest Well in this Reservoir'] = row[15].strip()
                     field_data['Number of Wells in this Reservoir'] = row[17].strip()
-                    permit_fields_df = pd.concat([permit_fields_df, pd.DataFrame([field_data])], ignore_index=True)
+                    field_rows.append(field_data)
 
                 # process only non-empty rows
                 if cell0:
@@ -322,27 +321,11 @@ def extract_data_from_pdf(file_path):
             else:
                 data["Substandard Acreage Field"] = None
             
-            return data, permit_fields_df
-
-
-
-# Get paths from the selected folder
-all_files = []
-for root_dir, _, files in os.walk(input_folder_path):
-    for file in files:
-        full_path = os.path.join(root_dir, file)
-        all_files.append(full_path)
+            return data, field_rows
 
-#filter between permit and plat files
-permit_files = [f for f in all_files if f.endswith('.pdf') and 'W1_AsApprovedW1' in f]
-plat_files = [f for f in all_files if '_Plat_' in f]
 
-for file_path in permit_files:
-    data, permit_fields_df = extract_data_from_pdf(file_path)
-    permit_df = pd.concat([permit_df, pd.DataFrame([data])], ignore_index=True)
-    field_df = pd.concat([field_df, permit_fields_df], ignore_index=True)
-
-for file_path in plat_files:
+def extract_plat_data(file_path):
+    """Plat row (platcolumns) for one plat file; .tif plats are converted to PDF first. None if it can't be read."""
     #Normalize file type
     if file_path.endswith('.tif'):
         #convert tif to pdf
@@ -354,21 +337,21 @@ for file_path in plat_files:
                 file_path = pdf_file_path  # Update file path to the new PDF file
         except FileNotFoundError:
             print(f"Error: The file {file_path} was not found.")
-            continue
+            return None
         except IOError:
             print(f"Error: There was an issue with the image file {file_path}.")
-            continue
+            return None
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
-            continue
+            return None
     
     if not file_path.lower().endswith('.pdf'):
         print(f"Skipping non-PDF file: {file_path}")
-        continue  
+        return None
 
     # Extract data from the PDF file
     data = {col: "" for col in platcolumns}
-    data["API Number"] = file_path.split("\\")[-1].split("_")[0]  # Extract API Number from file name
+    data["API Number"] = os.path.basename(file_path).split("_")[0]  # Extract API Number from file name
     data["File Path"] = file_path 
     file_name=os.path.basename(file_path)
     docName = re.sub(r'^\d+_Plat_', '', file_name) # Remove the trailing number and .pdf extension
@@ -377,46 +360,210 @@ for file_path in plat_files:
     with pdfplumber.open(file_path) as pdf:
         data["Page Count"] = len(pdf.pages)
         #get all text
-        all_text = ''
-        for page in pdf.pages:
-            #get page rotation
-
-            all_text += page.extract_text() + " , "
-        data["contents"] = all_text.strip()  # Store the extracted text
-
-    if not data["contents"]:
-        all_text = ''
-        # Convert PDF to images and use OCR if no text is extracted
-        images = convert_from_path(file_path)
-        for i, image in enumerate(images):
-            # Use OCR to extract text from the image
-            text = pytesseract.image_to_string(image)
-            if text:
-                print(f"OCR extracted text from page {i + 1} of {file_path}")
-            all_text += text + " , "
-
-    data["contents"] = data["contents"].replace('\n', ' ').strip()  # Clean up the text``
-
-    plat_df = pd.concat([plat_df, pd.DataFrame([data])], ignore_index=True)
-
-
-# Check if file exists
-permit_file_exists = os.path.isfile(permit_csv_path)
-field_file_exists = os.path.isfile(field_csv_path)
-plat_file_exists = os.path.isfile(plat_csv_path)
-
-# Append with or without header based on existence
-# If Replace is True, overwrite the files; otherwise, append to them
-if Replace:
-    print("Replacing existing files with new data.")
-    permit_df.to_csv(permit_csv_path, mode='w', index=False, header=True)
-    field_df.to_csv(field_csv_path, mode='w', index=False, header=True) 
-    plat_df.to_csv(plat_csv_path, mode='w', index=False, header=True)
-else:
-    print("Appending new data to existing files.")
-    permit_df.to_csv(permit_csv_path, mode='a', index=False, header=not permit_file_exists)
-    field_df.to_csv(field_csv_path, mode='a', index=False, header=not field_file_exists)
-    plat_df.to_csv(plat_csv_path, mode='a', index=False, header=not plat_file_exists)
-
-end = time.time()
-print(f"Data extraction completed in {end - start:.2f} seconds.")
\ No newline at end of file
+        texts = [page.extract_text() or "" for page in pdf.pages]
+
+    # No text layer (scanned plat): contents stays empty and main() runs the OCR stage (plat_ocr.py)
+    if any(text.strip() for text in texts):
+        data["contents"] = clean_contents("".join(text + " , " for text in texts))
+
+    return data
+
+def clean_contents(all_text):
+    return all_text.replace('\n', ' ').strip()  # Clean up the text
+
+
+#---- Process pool workers (return plain dicts so results pickle cheaply) ----
+def process_permit_file(file_path):
+    """Returns (file_path, permit row or None, field rows, error message or None)."""
+    try:
+        result = extract_data_from_pdf(file_path)
+        if result is None:
+            return file_path, None, [], "no table found on the first page"
+        data, field_rows = result
+        return file_path, data, field_rows, None
+    except Exception as e:
+        return file_path, None, [], f"{type(e).__name__}: {e}"
+
+def process_plat_file(file_path):
+    """Returns (file_path, plat row or None, error message or None)."""
+    try:
+        return file_path, extract_plat_data(file_path), None
+    except Exception as e:
+        return file_path, None, f"{type(e).__name__}: {e}"
+
+def find_input_files(folder_path):
+    """(permit files, plat files) under `folder_path`."""
+    all_files = []
+    for root_dir, _, files in os.walk(folder_path):
+        for file in files:
+            full_path = os.path.join(root_dir, file)
+            all_files.append(full_path)
+
+    #filter between permit and plat files
+    permit_files = [f for f in all_files if f.endswith('.pdf') and 'W1_AsApprovedW1' in f]
+    plat_files = [f for f in all_files if '_Plat_' in f]
+    return permit_files, plat_files
+
+def run_jobs(worker, file_paths, workers):
+    """Yield worker(file_path) for every file, in file order, sharded across `workers` processes (1 = in-process)."""
+    if workers <= 1:
+        yield from map(worker, file_paths)
+        return
+    chunksize = max(1, min(32, len(file_paths) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(worker, file_paths, chunksize=chunksize)
+
+class CsvChunkWriter:
+    """
+    Append-only row buffer for one output CSV, written out every `chunk_size` rows.
+    The first chunk overwrites the file when `replace` is set, otherwise rows are appended
+    (header only when the file is new).
+    """
+
+    def __init__(self, path, columns, replace, chunk_size=5000):
+        self.path = path
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.rows = []
+        self.written = 0
+        self._mode = "w" if replace else "a"
+        self._header = replace or not os.path.isfile(path)
+
+    def append(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def flush(self):
+        if not self.rows and self._mode == "a":
+            return
+        pd.DataFrame(self.rows, columns=self.columns).to_csv(self.path, mode=self._mode, index=False, header=self._header)
+        self.written += len(self.rows)
+        self.rows = []
+        self._mode, self._header = "a", False
+
+    def close(self):
+        """Write what is left (an empty replaced file still gets its header)."""
+        self.flush()
+        return self.written
+
+def write_outputs(manifest, output_dir, output_format="csv"):
+    """
+    Rewrite the outputs from the manifest (one row per API Number / plat), streamed in chunks:
+    the CSVs and/or typed Parquet datasets partitioned by RRC district (permit_parquet.py).
+    """
+    writers = []  # (table, writer) per output
+    if output_format in ("csv", "both"):
+        writers += [
+            ("permits", CsvChunkWriter(os.path.join(output_dir, permit_csv_name), columns, replace=True)),
+            ("fields", CsvChunkWriter(os.path.join(output_dir, field_csv_name), fieldcolumns, replace=True)),
+            ("plats", CsvChunkWriter(os.path.join(output_dir, plat_csv_name), platcolumns, replace=True)),
+        ]
+    if output_format in ("parquet", "both"):
+        import permit_parquet  # pyarrow is only needed for Parquet output
+
+        writers += [
+            ("permits", permit_parquet.PartitionedParquetWriter(os.path.join(output_dir, "permits"), permit_parquet.permit_schema)),
+            ("fields", permit_parquet.PartitionedParquetWriter(os.path.join(output_dir, "fields"), permit_parquet.field_schema)),
+            ("plats", permit_parquet.PartitionedParquetWriter(os.path.join(output_dir, "plats"), permit_parquet.plat_schema)),
+        ]
+
+    # Plats have no district of their own, they go with their permit's
+    districts = {}
+    for table in ("permits", "fields", "plats"):
+        table_writers = [writer for name, writer in writers if name == table]
+        for row in manifest.rows(table):
+            if table == "permits":
+                districts[row["API Number"]] = row.get("RRC District No.")
+            district = row.get("RRC District No.") if table != "plats" else districts.get(row["API Number"])
+            for writer in table_writers:
+                if isinstance(writer, CsvChunkWriter):
+                    writer.append(row)
+                else:
+                    writer.append(row, district)
+
+    counts = {}
+    for table, writer in writers:
+        counts[table] = writer.close()
+    print(f"Wrote {counts.get('permits', 0)} permits, {counts.get('fields', 0)} fields and {counts.get('plats', 0)} plats ({output_format})")
+
+def store_plat(manifest, file_path, data):
+    """Upsert a plat row (None for unreadable / non-PDF plats) and record its file in the manifest."""
+    if data is not None:
+        manifest.upsert_plat(data)
+        file_path = data["File Path"]  # .tif plats come back as the converted .pdf
+    if os.path.exists(file_path):
+        # unreadable/non-PDF plats are recorded too so they aren't retried until they change
+        manifest.record_file(file_path, "plat", extractor_version, data["API Number"] if data else None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract W-1 permit, field and plat data from RRC PDFs.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes to extract with (1 = no pool)")
+    parser.add_argument("--input", default=input_folder_path, help="folder of permit / plat files")
+    parser.add_argument("--output", default=output_folder_path, help="folder for the CSVs and the manifest")
+    parser.add_argument("--full", action="store_true", help="re-extract every file, not only new or changed ones")
+    parser.add_argument("--ocr-dpi", type=int, default=300, help="render DPI for OCR of scanned plats")
+    parser.add_argument("--ocr-max-pages", type=int, default=5, help="OCR at most this many pages per plat")
+    parser.add_argument("--format", choices=("csv", "parquet", "both"), default="csv",
+                        help="CSVs, Parquet datasets partitioned by RRC district, or both")
+    args = parser.parse_args()
+
+    start = time.time()
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest = permit_manifest.PermitManifest(os.path.join(args.output, manifest_name))
+
+    # Get paths from the selected folder, keeping only files not already extracted as they are now
+    permit_files, plat_files = find_input_files(args.input)
+    found = len(permit_files) + len(plat_files)
+    if not args.full:
+        permit_files = manifest.needs_processing(permit_files, extractor_version)
+        plat_files = manifest.needs_processing(plat_files, extractor_version)
+    print(f"Extracting {len(permit_files)} permit files and {len(plat_files)} plat files "
+          f"({found - len(permit_files) - len(plat_files)} unchanged), using {args.workers} workers")
+
+    # Results are upserted by API Number as they come back
+    for done, (file_path, data, field_rows, error) in enumerate(run_jobs(process_permit_file, permit_files, args.workers), start=1):
+        if error:
+            print(f"⚠️ Skipping permit {file_path}: {error}")
+            continue
+        if not data["API Number"]:
+            print(f"⚠️ No API Number in {file_path}, not stored")
+            continue
+        manifest.upsert_permit(data, field_rows)
+        manifest.record_file(file_path, "permit", extractor_version, data["API Number"])
+        if done % 200 == 0:
+            manifest.commit()
+
+    ocr_pending = []
+    for done, (file_path, data, error) in enumerate(run_jobs(process_plat_file, plat_files, args.workers), start=1):
+        if error:
+            print(f"⚠️ Skipping plat {file_path}: {error}")
+            continue
+        if data is not None and not data["contents"]:
+            ocr_pending.append(data)  # stored once OCR fills in its contents
+            continue
+        store_plat(manifest, file_path, data)
+        if done % 200 == 0:
+            manifest.commit()
+
+    # OCR stage for plats with no text layer
+    if ocr_pending:
+        print(f"Running OCR on {len(ocr_pending)} scanned plats")
+        for data, text in plat_ocr.ocr_plats(ocr_pending, manifest, args.ocr_dpi, args.ocr_max_pages, args.workers):
+            data["contents"] = clean_contents(text)
+            store_plat(manifest, data["File Path"], data)
+    manifest.commit()
+
+    write_outputs(manifest, args.output, args.format)
+    manifest.close()
+
+    end = time.time()
+    print(f"Data extraction completed in {end - start:.2f} seconds.")
+
+if __name__ == "__main__":
+    main()
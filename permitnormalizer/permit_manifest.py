@@ -0,0 +1,149 @@
+# SQLite manifest + result store for permitDigitizer.py.
+# Remembers every processed file (size, mtime, sha256, extractor version) so reruns
+# only extract new or changed files, and keeps the extracted rows keyed by API Number
+# so a re-extracted permit replaces its old rows instead of being appended again.
+# The output CSVs are exported from here after each run.
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+schema = """
+CREATE TABLE IF NOT EXISTS files (
+    path              TEXT PRIMARY KEY,
+    kind              TEXT NOT NULL,      -- permit / plat
+    size              INTEGER NOT NULL,
+    mtime_ns          INTEGER NOT NULL,
+    sha256            TEXT NOT NULL,
+    extractor_version TEXT NOT NULL,
+    api_number        TEXT,
+    processed_at      REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS permits (
+    api_number TEXT PRIMARY KEY,
+    file_path  TEXT,
+    row        TEXT NOT NULL              -- JSON of the permit row
+);
+CREATE TABLE IF NOT EXISTS fields (
+    api_number TEXT NOT NULL,
+    position   INTEGER NOT NULL,
+    row        TEXT NOT NULL,
+    PRIMARY KEY (api_number, position)
+);
+CREATE TABLE IF NOT EXISTS plats (
+    api_number TEXT NOT NULL,
+    name       TEXT NOT NULL,
+    file_path  TEXT,
+    row        TEXT NOT NULL,
+    PRIMARY KEY (api_number, name)
+);
+CREATE TABLE IF NOT EXISTS ocr_cache (
+    page_hash TEXT PRIMARY KEY,           -- sha256 of the rendered page (plat_ocr.py)
+    text      TEXT NOT NULL
+);
+"""
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class PermitManifest:
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(schema)
+        self._hashes = {}  # (path, size, mtime_ns) -> sha256 computed this run
+
+    def _hash(self, path, stat):
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if key not in self._hashes:
+            self._hashes[key] = file_sha256(path)
+        return self._hashes[key]
+
+    def needs_processing(self, paths, extractor_version):
+        """
+        The paths that are new, changed, or were extracted by another extractor version.
+        A file whose size/mtime changed but whose content hash didn't is only re-stamped.
+        """
+        known = {
+            path: (size, mtime_ns, sha256, version)
+            for path, size, mtime_ns, sha256, version in self.conn.execute(
+                "SELECT path, size, mtime_ns, sha256, extractor_version FROM files"
+            )
+        }
+        todo = []
+        for path in paths:
+            stat = os.stat(path)
+            entry = known.get(path)
+            if entry is None or entry[3] != extractor_version:
+                todo.append(path)
+            elif (entry[0], entry[1]) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            elif entry[2] == self._hash(path, stat):
+                self.conn.execute(
+                    "UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                    (stat.st_size, stat.st_mtime_ns, path),
+                )
+            else:
+                todo.append(path)
+        self.conn.commit()
+        return todo
+
+    def record_file(self, path, kind, extractor_version, api_number=None):
+        stat = os.stat(path)
+        self.conn.execute("""
+            INSERT INTO files (path, kind, size, mtime_ns, sha256, extractor_version, api_number, processed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (path) DO UPDATE SET
+                kind = excluded.kind, size = excluded.size, mtime_ns = excluded.mtime_ns,
+                sha256 = excluded.sha256, extractor_version = excluded.extractor_version,
+                api_number = excluded.api_number, processed_at = excluded.processed_at
+        """, (path, kind, stat.st_size, stat.st_mtime_ns, self._hash(path, stat),
+              extractor_version, api_number, time.time()))
+
+    def upsert_permit(self, data, field_rows):
+        """Replace the permit row and field rows stored for data["API Number"]."""
+        api_number = data["API Number"]
+        self.conn.execute("""
+            INSERT INTO permits (api_number, file_path, row) VALUES (?, ?, ?)
+            ON CONFLICT (api_number) DO UPDATE SET file_path = excluded.file_path, row = excluded.row
+        """, (api_number, data["File Path"], json.dumps(data, default=str)))
+        self.conn.execute("DELETE FROM fields WHERE api_number = ?", (api_number,))
+        self.conn.executemany(
+            "INSERT INTO fields (api_number, position, row) VALUES (?, ?, ?)",
+            [(api_number, i, json.dumps(row, default=str)) for i, row in enumerate(field_rows)],
+        )
+
+    def upsert_plat(self, data):
+        """Replace the plat stored for (API Number, plat name)."""
+        self.conn.execute("""
+            INSERT INTO plats (api_number, name, file_path, row) VALUES (?, ?, ?, ?)
+            ON CONFLICT (api_number, name) DO UPDATE SET file_path = excluded.file_path, row = excluded.row
+        """, (data["API Number"], data["name"], data["File Path"], json.dumps(data, default=str)))
+
+    def save_ocr_text(self, page_hash, text):
+        self.conn.execute(
+            "INSERT INTO ocr_cache (page_hash, text) VALUES (?, ?) ON CONFLICT (page_hash) DO UPDATE SET text = excluded.text",
+            (page_hash, text),
+        )
+
+    def rows(self, table):
+        """Yield the stored rows of "permits", "fields" or "plats" as dicts, ordered by API Number."""
+        order = {"permits": "api_number", "fields": "api_number, position", "plats": "api_number, name"}[table]
+        for (row,) in self.conn.execute(f"SELECT row FROM {table} ORDER BY {order}"):
+            yield json.loads(row)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,214 @@
+# Typed Parquet output for permitDigitizer.py.
+# Each table is written as a hive-partitioned dataset by RRC district
+# (<output>/permits/district=01/part-0.parquet ...), one row group per chunk,
+# so loads can prune columns and skip districts instead of parsing whole CSVs:
+#   load_table(output_dir, "permits", columns=["API Number", "County"], filters=[("district", "=", "08")])
+# The district is always a string ("08", "7C"): the same explicit partitioning is used
+# to name the folders and to read them back, so pyarrow never infers it as an integer.
+
+import os
+import re
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+partition_column = "district"
+unknown_partition = "unknown"
+partitioning = ds.partitioning(pa.schema([(partition_column, pa.string())]), flavor="hive")
+
+def _flag(name):
+    return pa.field(name, pa.bool_())
+
+permit_schema = pa.schema([
+    pa.field("API Number", pa.string()),
+    pa.field("File Path", pa.string()),
+    pa.field("Page Count", pa.int32()),
+    pa.field("Drilling Permit Number", pa.string()),
+    pa.field("SWR Exception", pa.string()),
+    pa.field("Form Type", pa.string()),
+    pa.field("Permit Status", pa.string()),
+    pa.field("RRC Operator No.", pa.string()),
+    pa.field("Operator's Name", pa.string()),
+    pa.field("Operator Address", pa.string()),
+    pa.field("Lease Name", pa.string()),
+    pa.field("Well No.", pa.string()),
+    _flag("Purpose of filing: New Drill"),
+    _flag("Purpose of filing: Recompletion"),
+    _flag("Purpose of filing: Reclass"),
+    _flag("Purpose of filing: Field Transfer"),
+    _flag("Purpose of filing: Re-Enter"),
+    _flag("Purpose of filing: Amended"),
+    _flag("Purpose of filing: Amended as Drilled (BHL)"),
+    _flag("Wellbore Profile: Vertical"),
+    _flag("Wellbore Profile: Horizontal"),
+    _flag("Wellbore Profile: Directional"),
+    _flag("Wellbore Profile: Sidetrack"),
+    pa.field("Total Depth", pa.int32()),
+    _flag("Right to develop minerals"),
+    _flag("Hydrogen sulfide area"),
+    pa.field("RRC District No.", pa.string()),  # "7C", "8A", ... not numeric
+    pa.field("County", pa.string()),
+    pa.field("Surface Location", pa.dictionary(pa.int8(), pa.string())),
+    pa.field("Distance to nearest town", pa.float64()),
+    pa.field("Direction to nearest town", pa.string()),
+    pa.field("Nearest Town", pa.string()),
+    pa.field("Section", pa.string()),
+    pa.field("Block", pa.string()),
+    pa.field("Survey", pa.string()),
+    pa.field("Abstract No.", pa.string()),
+    pa.field("Distance to nearest lease line", pa.float64()),
+    pa.field("Number of contiguous acres in lease", pa.float64()),
+    pa.field("Lease Perpendiculars Distance 1", pa.int32()),
+    pa.field("Lease Perpendiculars Direction 1", pa.string()),
+    pa.field("Lease Perpendiculars Distance 2", pa.int32()),
+    pa.field("Lease Perpendiculars Direction 2", pa.string()),
+    pa.field("Survey Perpendiculars Distance 1", pa.int32()),
+    pa.field("Survey Perpendiculars Direction 1", pa.string()),
+    pa.field("Survey Perpendiculars Distance 2", pa.int32()),
+    pa.field("Survey Perpendiculars Direction 2", pa.string()),
+    _flag("Is this a pooled unit?"),
+    pa.field("Unitization Docket No", pa.string()),
+    _flag("Substandard Acreage Field"),
+    pa.field("Field ID's", pa.string()),
+    pa.field("Remarks", pa.string()),
+    pa.field("Name of filer", pa.string()),
+    pa.field("Date submitted", pa.string()),
+    pa.field("Phone", pa.string()),
+    pa.field("E-mail Address (OPTIONAL)", pa.string()),
+    pa.field("RRC Use Only Data Validation Time Stamp", pa.string()),
+])
+
+field_schema = pa.schema([
+    pa.field("API Number", pa.string()),
+    pa.field("RRC District No.", pa.string()),
+    pa.field("Field No.", pa.string()),
+    pa.field("Field Name", pa.string()),
+    pa.field("Well Type", pa.string()),
+    pa.field("Completion Depth", pa.int32()),
+    pa.field("Distance to Nearest Well in this Reservoir", pa.float64()),
+    pa.field("Number of Wells in this Reservoir", pa.int32()),
+])
+
+plat_schema = pa.schema([
+    pa.field("API Number", pa.string()),
+    pa.field("File Path", pa.string()),
+    pa.field("Page Count", pa.int32()),
+    pa.field("name", pa.string()),
+    pa.field("contents", pa.large_string()),
+])
+
+_number_junk = re.compile(r"[^0-9.\-]")
+
+def _to_bool(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    text = str(value).strip().lower()
+    return {"true": True, "false": False}.get(text)
+
+def _to_float(value):
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = _number_junk.sub("", str(value))
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+def _to_int(value):
+    number = _to_float(value)
+    if number is None or not -2**31 <= number < 2**31:
+        return None
+    return int(number)
+
+def _to_str(value):
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+_converters = {pa.types.is_boolean: _to_bool, pa.types.is_integer: _to_int, pa.types.is_floating: _to_float}
+
+def _converter(field):
+    for test, convert in _converters.items():
+        if test(field.type):
+            return convert
+    return _to_str
+
+def to_table(rows, schema):
+    """pa.Table of `rows` (extractor dicts, values mostly text) cast to `schema`; unparseable values become null."""
+    columns = []
+    for field in schema:
+        convert = _converter(field)
+        values = [convert(row.get(field.name)) for row in rows]
+        if pa.types.is_dictionary(field.type):
+            columns.append(pa.array(values, pa.string()).dictionary_encode().cast(field.type))
+        else:
+            columns.append(pa.array(values, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def partition_value(value):
+    value = _to_str(value)
+    return re.sub(r"[^0-9A-Za-z]", "", value) if value else unknown_partition
+
+class PartitionedParquetWriter:
+    """
+    Hive-partitioned Parquet dataset written incrementally: rows are buffered per
+    partition and each full buffer becomes one row group of that partition's file.
+    Written into a temp folder and swapped into place on close().
+    """
+
+    def __init__(self, root, schema, rows_per_group=10000, compression="zstd"):
+        self.root = root
+        self.schema = schema
+        self.rows_per_group = rows_per_group
+        self.compression = compression
+        self.written = 0
+        self._tmp_root = f"{root}.tmp"
+        self._buffers = {}
+        self._writers = {}
+        shutil.rmtree(self._tmp_root, ignore_errors=True)
+
+    def append(self, row, partition):
+        partition = partition_value(partition)
+        buffer = self._buffers.setdefault(partition, [])
+        buffer.append(row)
+        if len(buffer) >= self.rows_per_group:
+            self._flush(partition)
+
+    def _flush(self, partition):
+        rows = self._buffers.pop(partition, [])
+        if not rows:
+            return
+        writer = self._writers.get(partition)
+        if writer is None:
+            folder = os.path.join(self._tmp_root, partitioning.format(pc.field(partition_column) == partition)[0])
+            os.makedirs(folder, exist_ok=True)
+            writer = self._writers[partition] = pq.ParquetWriter(
+                os.path.join(folder, "part-0.parquet"), self.schema, compression=self.compression,
+            )
+        writer.write_table(to_table(rows, self.schema))
+        self.written += len(rows)
+
+    def close(self):
+        for partition in list(self._buffers):
+            self._flush(partition)
+        for writer in self._writers.values():
+            writer.close()
+        os.makedirs(self._tmp_root, exist_ok=True)  # an empty dataset is still a folder
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.replace(self._tmp_root, self.root)
+        return self.written
+
+def load_table(output_dir, table, columns=None, filters=None):
+    """
+    Read "permits", "fields" or "plats" as a DataFrame, only the given columns and
+    only the row groups / districts matching `filters` (pyarrow filter syntax).
+    """
+    return pq.read_table(
+        os.path.join(output_dir, table), columns=columns, filters=filters, partitioning=partitioning,
+    ).to_pandas()
@@ -0,0 +1,108 @@
+# OCR fallback for plats without a text layer.
+# Each page is rendered on its own (PyMuPDF, grayscale, configurable DPI) inside a
+# worker process and run through tesseract there, so nothing but file names and text
+# crosses the process boundary. Copies of the same plat file in one run are OCR'd once
+# (pages are deduplicated by file hash before they're submitted), and OCR text is cached
+# in the manifest by a hash of the rendered page, so later runs never OCR a page again.
+
+import hashlib
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF for rendering
+import pytesseract
+from PIL import Image
+
+import permit_manifest
+
+_cache = None  # per worker process read connection to the manifest's ocr_cache
+
+def _open_cache(cache_path):
+    global _cache
+    _cache = sqlite3.connect(cache_path) if cache_path else None
+
+def _cached_text(page_hash):
+    if _cache is None:
+        return None
+    row = _cache.execute("SELECT text FROM ocr_cache WHERE page_hash = ?", (page_hash,)).fetchone()
+    return row[0] if row else None
+
+def ocr_page(job):
+    """(file_path, page_number, dpi) -> (page_hash, text, was_cached, error). Renders only this page."""
+    file_path, page_number, dpi = job
+    try:
+        with fitz.open(file_path) as doc:
+            pix = doc[page_number].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        page_hash = hashlib.sha256(f"{pix.width}x{pix.height}:".encode() + pix.samples).hexdigest()
+
+        text = _cached_text(page_hash)
+        if text is not None:
+            return page_hash, text, True, None
+
+        image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        return page_hash, pytesseract.image_to_string(image), False, None
+    except Exception as e:
+        return None, "", False, f"{type(e).__name__}: {e}"
+
+def ocr_plats(plats, manifest, dpi=300, max_pages=5, workers=1):
+    """
+    OCR the first `max_pages` pages of every plat row in `plats` (rows from extract_plat_data).
+    Yields (plat row, text) in order; new page texts are saved to the manifest's OCR cache.
+    Plats with a page that failed are reported and not yielded, so the next run retries them.
+    """
+    # Identical files render identical pages, so each (file hash, page) is submitted once
+    jobs = []
+    job_ids = {}
+    plat_jobs = []  # per plat, the index in `jobs` of each of its pages
+    for data in plats:
+        digest = permit_manifest.file_sha256(data["File Path"])
+        page_jobs = []
+        for page_number in range(min(int(data["Page Count"] or 0), max_pages)):
+            key = (digest, page_number)
+            if key not in job_ids:
+                job_ids[key] = len(jobs)
+                jobs.append((data["File Path"], page_number, dpi))
+            page_jobs.append(job_ids[key])
+        plat_jobs.append(page_jobs)
+
+    if workers <= 1:
+        _open_cache(manifest.path)
+        results = map(ocr_page, jobs)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_open_cache, initargs=(manifest.path,))
+        results = pool.map(ocr_page, jobs)
+
+    done = []  # results in job order, pulled as the plats need them
+    used = set()  # job ids already counted for an earlier copy of the file
+    try:
+        cached = ocrd = duplicates = 0
+        for data, page_jobs in zip(plats, plat_jobs):
+            texts = []
+            failed = False
+            for page_number, job_id in enumerate(page_jobs):
+                while len(done) <= job_id:
+                    done.append(next(results))
+                page_hash, text, was_cached, error = done[job_id]
+                if error:
+                    print(f"⚠️ OCR failed on page {page_number + 1} of {data['File Path']}: {error}")
+                    failed = True
+                    continue
+                if job_id in used:
+                    duplicates += 1
+                elif was_cached:
+                    cached += 1
+                else:
+                    ocrd += 1
+                    manifest.save_ocr_text(page_hash, text)
+                used.add(job_id)
+                if text.strip():
+                    print(f"OCR extracted text from page {page_number + 1} of {data['File Path']}")
+                texts.append(text)
+            manifest.commit()  # keeps the OCR done so far if the run is interrupted
+            if not failed:
+                yield data, "".join(text + " , " for text in texts)
+        print(f"OCR'd {ocrd} pages ({cached} from cache, {duplicates} from duplicate files) at {dpi} DPI")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
@@ -1,274 +1,360 @@
 # Standard library
+import base64
 import csv
 import os
-import random
 import sys
 import time
-from datetime import datetime
+from datetime import date, datetime
 import requests
 from PIL import Image
 import glob
+import math
 import re
+from urllib.parse import parse_qs, urlencode, urljoin, urlsplit, urlunsplit
 
 # Third-party packages
 import pandas as pd
 import psycopg
 from dotenv import load_dotenv
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
-#Helpers
-def acres_string_to_float(acreage_str):
-    """Convert a string like '1 1/2', '1/5', '40', or '.5' into a float."""
-    if not acreage_str or not isinstance(acreage_str, str):
+# Local imports
+import browser_contexts
+import document_grabber
+import document_store
+import govos_api
+import throttle
+from legal_parser import acres_string_to_float, parse_legal_description
+
+# Search results page selectors
+search_box_selector = '[data-testid="searchInputBox"]'
+search_button_selector = '[data-testid="searchSubmitButton"]'
+table_row_selector = "#main-content div.search-results__results-wrap div.a11y-table table tbody tr"  # Selector for table rows in results
+nxt_button_selector = "#main-content div.search-results__results-wrap div.search-results__pagination nav div button:last-child"  # Selector for the "Next" button in pagination
+pagination_button_selector = "#main-content div.search-results__results-wrap div.search-results__pagination nav button"  # All pagination buttons (page numbers + prev/next)
+
+def build_result_row(text, doc_id, county_link):
+    """Turn the 7 column cells of one results row + its GovOS document id into a row dict."""
+    # extract columns from row text
+    grantor, grantee, doc_type, recorded_date, doc_number, book_vol_page, legal_description = (
+        text + [None] * (7 - len(text))  # pad if short
+    )[:7]
+
+    # Get document link from document id
+    doc_link = None
+    if doc_id:
+        doc_link = f"{county_link.rstrip('/')}/doc/{doc_id}"
+
+    # Parse legal description
+    parsed = parse_legal_description(legal_description, doc_type)
+    abs_num, survey_name, acres, subdivision, case_number, misc_legal = parsed
+
+    return {
+        "grantor": grantor,
+        "grantee": grantee,
+        "doc_type": doc_type,
+        "recorded_date": recorded_date,
+        "doc_number": doc_number,
+        "book_vol_page": book_vol_page,
+        "legal_description": legal_description,
+        "doc_link": doc_link,
+
+        # ✅ parsed fields
+        "abstract_num":      abs_num,
+        "survey_name":  survey_name,
+        "acres":      acres,
+        "subdivision":  subdivision,
+        "case_number":  case_number,
+        "misc_legal":   misc_legal,
+    }
+
+# Pulls text + checkbox id of every results row in one round-trip
+extract_rows_js = """selector => Array.from(document.querySelectorAll(selector), row => {
+    const checkbox = row.querySelector("input[data-testid='searchResultCheckbox']");
+    return {text: row.innerText, checkbox_id: checkbox ? checkbox.id : null};
+})"""
+
+# Resolves once the first results row differs from `first` (the page changed)
+page_changed_js = """first => {
+    const rows = document.querySelectorAll(
+    "#main-content div.search-results__results-wrap div.a11y-table table tbody tr"
+    );
+    if (rows.length === 0) return false;
+    return rows[0].innerText.trim() !== first;
+}"""
+
+# Resolves to "rows" once the results table has rows, "empty" once the site says nothing matched
+results_state_js = """selector => {
+    if (document.querySelector(selector)) return "rows";
+    const main = document.querySelector("#main-content");
+    if (main && /\\bno (matching )?(results|records|documents)( were)? found\\b/i.test(main.innerText)) return "empty";
+    return false;
+}"""
+
+def wait_for_results(page, timeout=None):
+    """
+    Wait for the search results: True once rows show, False when the site reports no results.
+    Anything else (slow page, dead host, changed selectors) raises PlaywrightTimeoutError.
+    """
+    state = page.wait_for_function(results_state_js, arg=table_row_selector, timeout=timeout)
+    return state.json_value() == "rows"
+
+def extract_page_rows(page, county_link):
+    """Extract every row of the results page currently loaded in `page` with a single page.evaluate call."""
+    return rows_from_raw(page.evaluate(extract_rows_js, table_row_selector), county_link)
+
+def rows_from_raw(raw_rows, county_link):
+    """Build row dicts from the output of extract_rows_js."""
+    page_rows = []
+    for raw in raw_rows:
+        # Get document id from checkbox id
+        checkbox_id = raw["checkbox_id"]  # e.g. "table-checkbox-94560668"
+        doc_id = None
+        if checkbox_id and "table-checkbox-" in checkbox_id:
+            doc_id = checkbox_id.replace("table-checkbox-", "")
+
+        page_rows.append(build_result_row(raw["text"].strip().split("\t"), doc_id, county_link))
+    return page_rows
+
+# "1-50 of 1,234 results" style summary above the results table
+result_count_pattern = re.compile(r"\bof\s+([\d,]+)\s+(?:results|records|documents)\b", re.IGNORECASE)
+
+def get_result_count(page):
+    """Total number of results the site reports for the loaded search, or None if it shows none."""
+    text = page.eval_on_selector("#main-content", "main => main.innerText") if page.query_selector("#main-content") else ""
+    match = result_count_pattern.search(text or "")
+    return int(match.group(1).replace(",", "")) if match else None
+
+def get_page_count(page, limit=None):
+    """
+    Total number of result pages: the reported result count / `limit` when both are known,
+    otherwise the highest numbered pagination button (1 if there is no pagination).
+    Returns (page count, exact) where exact=False means the pager may be windowed
+    ("1 2 3 4 5 … Next") and the count a lower bound.
+    """
+    total = get_result_count(page) if limit else None
+    if total is not None:
+        return max(1, math.ceil(total / limit)), True
+    labels = page.eval_on_selector_all(pagination_button_selector, "buttons => buttons.map(b => b.innerText)")
+    page_numbers = []
+    for label in labels:
+        label = (label or "").strip().replace(",", "")
+        if label.isdigit():
+            page_numbers.append(int(label))
+    return (max(page_numbers) if page_numbers else 1), False
+
+def next_button_enabled(page):
+    next_btn = page.query_selector(nxt_button_selector)
+    return bool(next_btn) and not next_btn.is_disabled() and "disabled" not in (next_btn.get_attribute("class") or "")
+
+def set_url_params(url, params):
+    """Return `url` with the given query parameters added/replaced."""
+    parts = urlsplit(url)
+    query = parse_qs(parts.query, keep_blank_values=True)
+    for key, value in params.items():
+        query[key] = [str(value)]
+    return urlunsplit(parts._replace(query=urlencode(query, doseq=True)))
+
+def results_page_url(url, offset):
+    """Return the results url with its `offset` query parameter replaced."""
+    return set_url_params(url, {"offset": offset})
+
+def recorded_date_range(since):
+    """GovOS recordedDateRange value covering `since` through today."""
+    return f"{since:%Y%m%d},{date.today():%Y%m%d}"
+
+def drop_known_rows(page_rows, since):
+    """
+    Split off rows recorded before `since` (the stored watermark).
+    Returns (new rows, reached_known) where reached_known means this page
+    ran past the watermark in date-descending order, so later pages are all older.
+    """
+    if since is None:
+        return page_rows, False
+
+    dates = []
+    for row in page_rows:
+        try:
+            dates.append(datetime.strptime(row["recorded_date"], "%m/%d/%Y").date())
+        except (TypeError, ValueError):
+            dates.append(None)
+
+    new_rows = [row for row, d in zip(page_rows, dates) if d is None or d >= since]
+    known_dates = [d for d in dates if d is not None]
+    descending = all(a >= b for a, b in zip(known_dates, known_dates[1:]))
+    reached_known = descending and any(d < since for d in known_dates)
+    return new_rows, reached_known
+
+def finalize_results(results_list, search, county):
+    """Post-process scraped rows: parse recorded_date and add search metadata."""
+    for row in results_list:
+        # Fix recorded_date
+        date_str = row.get("recorded_date")
+        if date_str:
+            try:
+                row["recorded_date"] = datetime.strptime(date_str, "%m/%d/%Y").date()
+            except Exception:
+                row["recorded_date"] = None
+        else:
+            row["recorded_date"] = None
+
+        # Add metadata
+        row["search_term"] = search
+        row["source_county"] = county
+
+    return results_list
+
+def get_remaining_pages_parallel(page, county_link, max_concurrency=4):
+    """
+    Scrape result pages 2..N of the search currently loaded in `page`.
+
+    The page count is read up front (result count / page size, or the pagination
+    buttons) and every page is opened directly by its `offset` url, so up to
+    `max_concurrency` tabs in the same browser context load at once. Rows are
+    returned in page order. Returns None if the results url can't be paged by
+    offset, or if the count came from a possibly windowed pager and the last
+    fetched page wasn't the end (caller should fall back to clicking "Next").
+    """
+    query = parse_qs(urlsplit(page.url).query)
+    if "offset" not in query or "limit" not in query:
+        if get_page_count(page)[0] <= 1:
+            return []
+        print("⚠️ Results url has no offset/limit, can't fetch pages in parallel")
         return None
+    limit = int(query["limit"][0])
 
-    # Remove all characters except digits, dot, slash, and space
-    cleaned = re.sub(r'[^0-9./\s]', '', acreage_str).strip()
-
-    # Mixed number (e.g. '1 1/2')
-    if re.match(r'^\d+\s+\d+/\d+$', cleaned):
-        whole, num, den = map(float, re.findall(r'\d+', cleaned))
-        return round(whole + num / den, 6)
-
-    # Pure fraction (e.g. '1/5')
-    if re.match(r'^\d+/\d+$', cleaned):
-        num, den = map(float, re.findall(r'\d+', cleaned))
-        return round(num / den, 6)
-
-    # Decimal (e.g. '.5', '5.44')
-    if re.match(r'^\d*\.\d+$', cleaned):
-        return round(float(cleaned), 6)
-
-    # Whole number (e.g. '40')
-    if re.match(r'^\d+$', cleaned):
-        return round(float(cleaned), 6)
-
-    # If none of the above matched, return None
-    print('failed to convert string')
-    return None
-
-def parse_legal_description(legal_desc, doc_type):
-    """Extracts survey name and abs number from a single legal description string."""
-    if not isinstance(legal_desc, str):
-        return pd.Series([None, None, None, None, None, None])
-    
-    # Define regex patterns
-    abs_patterns = [
-        r'AB#\d+',
-        r'A-\d+',
-        r'Survey: \d+'
-    ]
-    survey_patterns = [
-        r'.*LEAGUE',
-        r'.*SUR',
-        r'.*GRANT',
-        r'Survey- Name: .*'
-    ]
-    unwanted_survey_phrases = [
-        'Survey- Name: ',
-        'Survey Name: ',
-        'Survey-',
-        'Survey -',
-        'GRANT',
-        'SURVEY',
-        'SUR',
-        'LEAGUE',
-        'Name: '
-    ]
-    acreage_patterns = [
-        # --- Decimals (with parentheses) ---
-        r'\(\d+\.\d+\s*ACRES\)',             # (5.44 ACRES), 5.44 ACS
-        r'\(\.\d+\s*ACRES\)',                # (.5 ACRES), (.5 ACS)
-        r'\(\d+\.\d+\s*ACS\)',             # (5.44 ACRES), 5.44 ACS
-        r'\(\.\d+\s*ACS\)',                # (.5 ACRES), (.5 ACS)
-        # --- Decimals (without parentheses) ---
-        r'\d*\.\d+\s*ACRES',             # (5.44 ACRES), 5.44 ACS
-        r'\.\d+\s*ACRES',                # (.5 ACRES), (.5 ACS)
-        r'\d*\.\d+\s*ACS',             # (5.44 ACRES), 5.44 ACS
-        r'\.\d+\s*ACS',                # (.5 ACRES), (.5 ACS)
-        # --- Mixed numbers (whole + fraction) ---
-        r'\(\d+\s+\d+/\d+\s*ACRES\)',        # (1 1/2 ACRES), 1 1/2 ACS
-        r'\d+\s+\d+/\d+\s*ACRES',
-        # --- Pure fractions ---
-        r'\(\d+/\d+\s*ACRES\)',              # (1/5 ACRES), 1/5 ACS
-        r'\d+/\d+\s*ACRES',
-        # --- Whole numbers ---
-        r'\(PT \d*\.?\d+ ACRES\)', # (PT 5.44 ACRES)
-        r'\(\d+\s*ACRES\)', 
-        r'\d+\s*ACRES',                  # (5 ACRES), 5 ACS
-        r'\d+ ACS',
-        # --- Labelled or unusual formatting ---
-        r'Acres?:\s*\d*\.?\d+', # Acres: 54.2 Acres: .96
-        r'Acres: \d'
-    ]
-    subdivision_patterns = [   
-        r'L-\w+ (?:\b\w+\b\s+)*ADDN',   
-        r'ADDN \d \d{5} \d{5} \d{3}[A-Z]',
-        r'ADDN \d{5} \d{5} \d{3}[A-Z]',
-        r'ADDN \d+',
-        r'SUBD LOT \d+',
-        r'SUBD \d+',
-        r'\d{5} \d{4} \d{4}[A-Z] \d{4}',
-        r'\d{5} \d{5} \d{4}',
-        r'\d{5} \d{5} \d{3}[A-Z]',
-        r'L-\w+ (?:\b\w+\b\s+)*',
-        r'\w+ \d{5}',
-        r'Subdivision\s?-'
-    ]
-    misc_legal_patterns = [
-        r'MULTIPLE TRACTS SEE INSTRUMENT',
-        r'N/A'
-    ]
-
-
-    
-    abs_num = None
-    survey_name = None
-    acres = None
-    subdivision = None
-    case_number = None
-    misc_legal = None
-
-    if doc_type == 'ABSTRACT JUDGEMT':
-        case_number = legal_desc.strip()
-        return pd.Series([abs_num, survey_name, acres, subdivision, case_number, misc_legal])
-
-    #Checks for undescriptive legal descriptions to return as misc_legal
-    for pattern in misc_legal_patterns:
-        match = re.search(pattern, legal_desc, re.IGNORECASE)
-        if match:
-            misc_legal = legal_desc.strip()
-            return pd.Series([abs_num, survey_name, acres, subdivision, case_number, misc_legal]) 
-
-    #Extract Columns from legal description---------------------
-    # ABS Number
-    for pattern in abs_patterns:
-        match = re.search(pattern, legal_desc)
-        if match:
-            abs_num = match.group(0)
-            legal_desc = legal_desc.replace(abs_num, '').strip()
-            # keep only digits from the match
-            abs_num = re.sub(r'\D', '', abs_num)
-            break
-    
-    #Numeric value of Acreage
-    for pattern in acreage_patterns:
-        match = re.search(pattern, legal_desc, re.IGNORECASE)
-        if match:
-            acreage_str=match.group(0)
-            legal_desc=legal_desc.replace(acreage_str,'').strip()
-            acres=acres_string_to_float(acreage_str)
-            break
+    page_count, exact = get_page_count(page, limit)
+    if page_count <= 1 and (exact or not next_button_enabled(page)):
+        return []
+    if page_count <= 1:
+        print("⚠️ Page count unknown, fetching pages one at a time")
+        return None
 
-    #Subdivision
-    for pattern in subdivision_patterns:
-        match = re.search(pattern, legal_desc, re.IGNORECASE)
-        if match:
-            subdivision = legal_desc 
-            return pd.Series([abs_num, survey_name, acres, subdivision, case_number, misc_legal])
-
-    # Survey Name
-    for pattern in survey_patterns:
-        match = re.search(pattern, legal_desc)
-        if match:
-            survey_name = match.group(0)
-            legal_desc = legal_desc.replace(survey_name, '').strip()
-            break
-        if not match:
-            if abs_num or acres:
-                survey_name = legal_desc.strip()
-                legal_desc = legal_desc.replace(survey_name, '').strip()
-                break
-
-    misc_legal = legal_desc.strip() 
-    if survey_name:
-        for phrase in unwanted_survey_phrases:
-            if phrase in survey_name:
-                survey_name = survey_name.replace(phrase, "")
-                misc_legal += f" st: {phrase}"
-        survey_name = survey_name.strip()
-
-    if survey_name=='':
-        survey_name = None
-    if misc_legal=='':
-        misc_legal = None
-
-    return pd.Series([abs_num, survey_name, acres, subdivision, case_number, misc_legal])
+    print(f"Fetching {page_count - 1} remaining pages with up to {max_concurrency} tabs")
+    host_throttle = throttle.for_url(county_link)
+    rows_by_page = {}
+    remaining = list(range(2, page_count + 1))
+    workers = [page.context.new_page() for _ in range(min(max_concurrency, len(remaining)))]
+    try:
+        for start in range(0, len(remaining), len(workers)):
+            batch = remaining[start:start + len(workers)]
+
+            # Start every navigation before waiting on any so the browser loads them concurrently
+            started = {}
+            responses = {}
+            for worker, page_num in zip(workers, batch):
+                host_throttle.acquire()
+                started[page_num] = time.monotonic()
+                responses[page_num] = worker.goto(results_page_url(page.url, (page_num - 1) * limit), wait_until="commit")
+
+            for worker, page_num in zip(workers, batch):
+                try:
+                    worker.wait_for_selector(table_row_selector)
+                except PlaywrightTimeoutError:
+                    host_throttle.record_response(responses[page_num], time.monotonic() - started[page_num], error=True, navigation=True)
+                    raise
+                host_throttle.record_response(responses[page_num], time.monotonic() - started[page_num], navigation=True)
+                rows_by_page[page_num] = extract_page_rows(worker, county_link)
+                print(f"Processed page {page_num}/{page_count}")
+
+                # A count read off the pager can be short of the real one; only trust it if this is the end
+                if page_num == page_count and not exact and len(rows_by_page[page_num]) >= limit and next_button_enabled(worker):
+                    print(f"⚠️ Results go past page {page_count}, fetching pages one at a time")
+                    return None
+    finally:
+        for worker in workers:
+            worker.close()
+
+    # Merge back in page order
+    results_list = []
+    for page_num in remaining:
+        results_list.extend(rows_by_page[page_num])
+    return results_list
 
 #Scrapes file metadata related to a search term from a county public records website 
-def get_search_results_table(search, county, county_link, page):
-    # Define selectors
-    search_box_selector = '[data-testid="searchInputBox"]'
-    search_button_selector = '[data-testid="searchSubmitButton"]'
-    table_row_selector = "#main-content div.search-results__results-wrap div.a11y-table table tbody tr"  # Selector for table rows in results
-    nxt_button_selector = "#main-content div.search-results__results-wrap div.search-results__pagination nav div button:last-child"  # Selector for the "Next" button in pagination
-    
-
+def get_search_results_table(search, county, county_link, page=None, parallel=False, max_concurrency=4, backend="playwright", since=None):
+    """
+    Search `county_link` for `search` and return every result row as a dict.
+
+    since (a date, e.g. the stored watermark from dbutils.get_search_watermark)
+    turns on incremental mode: the site is asked for documents recorded on or
+    after that date only, older rows are dropped, and paging stops once the
+    results run past it.
+
+    backend="playwright" drives the site in `page`. backend="api" skips the
+    browser and pages through the GovOS JSON search backend over HTTP
+    (see govos_api.py); `page`, `parallel` and `max_concurrency` are ignored.
+
+    parallel=True discovers the page count after the first page and fetches the
+    rest concurrently across up to `max_concurrency` pages in `page`'s browser
+    context. Otherwise pages are walked one at a time with the "Next" button.
+    """
     print(f"Searching for related files for: {search}")
     results_list = []
-    page.goto(county_link)
+
+    if backend == "api":
+        date_range = recorded_date_range(since) if since else None
+        for text, doc_id in govos_api.search_results(search, county_link, recorded_date_range=date_range):
+            results_list.append(build_result_row(text, doc_id, county_link))
+        results_list, _ = drop_known_rows(results_list, since)
+        print(f"Found {len(results_list)} results for {search}")
+        return finalize_results(results_list, search, county)
+    elif backend != "playwright":
+        raise ValueError(f"Unknown search backend: {backend}")
+
+    # Every request to the county host goes through its shared adaptive rate limit (throttle.py)
+    host_throttle = throttle.for_url(county_link)
+
+    with host_throttle.request() as request:
+        request.response(page.goto(county_link))
 
     #fill the search input box with the search term
     page.fill(search_box_selector, search)
 
-    #click the search button
-    page.click(search_button_selector)
-    print("Search submitted, waiting for results...")
+    #click the search button and wait for results (a timeout here is an error, not "no results")
+    with host_throttle.request():
+        page.click(search_button_selector)
+        print("Search submitted, waiting for results...")
+        has_results = wait_for_results(page)
+    if not has_results:
+        print(f"No results for {search}")
+        return []
 
-    # Wait for results to appear
-    page.wait_for_selector(table_row_selector)
+    if since:
+        # Reload the results limited to documents recorded since the watermark
+        print(f"Incremental search: only documents recorded since {since}")
+        try:
+            with host_throttle.request() as request:
+                request.response(page.goto(set_url_params(page.url, {"recordedDateRange": recorded_date_range(since), "offset": 0})))
+                has_results = wait_for_results(page, timeout=15000)
+        except PlaywrightTimeoutError:
+            # The undated search had rows, so an empty date range is what's left
+            print(f"⚠️ Date-limited results didn't load for {search}, assuming nothing new")
+            has_results = False
+        if not has_results:
+            print(f"No results for {search} since {since}")
+            return []
+
+    page_rows, reached_known = drop_known_rows(extract_page_rows(page, county_link), since)
+    results_list.extend(page_rows)
+    print(f"Processed page 1, total results so far: {len(results_list)}")
+    if reached_known:
+        print("Reached already-known documents, stopping")
+        return finalize_results(results_list, search, county)
+
+    if parallel:
+        remaining_rows = get_remaining_pages_parallel(page, county_link, max_concurrency)
+        if remaining_rows is not None:
+            remaining_rows, _ = drop_known_rows(remaining_rows, since)
+            results_list.extend(remaining_rows)
+            print(f"Found {len(results_list)} results for {search}")
+            return finalize_results(results_list, search, county)
 
     page_num = 1
 
     #---- Page loop ----
     while True:
-
-        rows = page.query_selector_all(table_row_selector)
-        # ---- Row loop --------------------------------------------------------------------
-        
-        for row in rows:
-            text = row.inner_text().strip().split("\t")
-
-            # extract columns from row text
-            grantor, grantee, doc_type, recorded_date, doc_number, book_vol_page, legal_description = (
-                text + [None] * (7 - len(text))  # pad if short
-            )
-
-            # Get document link from checkbox id
-            checkbox = row.query_selector("input[data-testid='searchResultCheckbox']")
-            doc_link = None
-            if checkbox:
-                checkbox_id = checkbox.get_attribute("id")  # e.g. "table-checkbox-94560668"
-                if checkbox_id and "table-checkbox-" in checkbox_id:
-                    doc_id = checkbox_id.replace("table-checkbox-", "")
-                    doc_link = f"{county_link.rstrip('/')}/doc/{doc_id}"
-
-            # Parse legal description
-            parsed = parse_legal_description(legal_description, doc_type)   
-            abs_num, survey_name, acres, subdivision, case_number, misc_legal = parsed 
-
-            # Append to results
-            results_list.append({
-                "grantor": grantor,
-                "grantee": grantee,
-                "doc_type": doc_type,
-                "recorded_date": recorded_date,
-                "doc_number": doc_number,
-                "book_vol_page": book_vol_page,
-                "legal_description": legal_description,
-                "doc_link": doc_link,
-
-                # ✅ parsed fields
-                "abstract_num":      abs_num,
-                "survey_name":  survey_name,
-                "acres":      acres,
-                "subdivision":  subdivision,
-                "case_number":  case_number,
-                "misc_legal":   misc_legal,
-            })
-            #---- End Row loop --------------------------------------------------------------------
-        print(f"Processed page {page_num}, total results so far: {len(results_list)}")
-        
         # Grab the "Next" button
         next_btn = page.query_selector(nxt_button_selector)
         if not next_btn:
@@ -280,88 +366,49 @@ def get_search_results_table(search, county, county_link, page):
             break
 
         #save first row text to detect page change
-        first_row_text = rows[0].inner_text().strip()
-
-        next_btn.click()
-
-        # Wait for page to load new results by checking that the first row has changed
-        page.wait_for_function(
-            """first => {
-                const rows = document.querySelectorAll(
-                "#main-content div.search-results__results-wrap div.a11y-table table tbody tr"
-                );
-                if (rows.length === 0) return false;
-                return rows[0].innerText.trim() !== first;
-            }""",
-            arg=first_row_text
-        )
+        first_row_text = page.eval_on_selector(table_row_selector, "row => row.innerText.trim()")
+
+        # Wait for our turn at the host, then for the first row to change (new page loaded)
+        with host_throttle.request():
+            next_btn.click()
+            page.wait_for_function(page_changed_js, arg=first_row_text)
 
         page_num += 1
         print("Navigated to next page")
 
-
-        time.sleep(random.uniform(0.1, 0.3))  # tiny jitter
+        page_rows, reached_known = drop_known_rows(extract_page_rows(page, county_link), since)
+        results_list.extend(page_rows)
+        print(f"Processed page {page_num}, total results so far: {len(results_list)}")
+        if reached_known:
+            print("Reached already-known documents, stopping")
+            break
 
     print(f"Found {len(results_list)} results for {search}")
 
     # Post-process results--------------------------------
-    for row in results_list:
-        # Fix recorded_date
-        date_str = row.get("recorded_date")
-        if date_str:
-            try:
-                row["recorded_date"] = datetime.strptime(date_str, "%m/%d/%Y").date()
-            except Exception:
-                row["recorded_date"] = None
-        else:
-            row["recorded_date"] = None
+    return finalize_results(results_list, search, county)
 
-        # Add metadata
-        row["search_term"] = search
-        row["source_county"] = county
-        
-    
-
-    return results_list
-
-
-
-
-def get_document(link, doc_id, county_name, page):
-    base_dir = r"C:\Users\milom\Documents\landman\county_clerk_docs"
-    output_dir = os.path.join(base_dir, county_name)
-    os.makedirs(output_dir, exist_ok=True)
-
-    print(f"➡️ Accessing {link}…")
-    page.goto(link)
-    page.wait_for_timeout(1500)
-
-    # Hide panel if visible
-    hide_button = page.query_selector("button.css-okyhgk")
-    if hide_button:
-        hide_button.click()
-        page.wait_for_timeout(500)
-
-    # Prepare environment for clarity
-    page.set_viewport_size({"width": 4000, "height": 3200})
-    page.evaluate("document.body.style.zoom = '200%'")
-    page.evaluate("document.body.style.background = 'white'")
-
-    # Detect total pages from input box
-    page_input = page.query_selector("input[aria-label='Page Number']")
-    if not page_input:
-        print("⚠️ Page input box not found.")
-        return []
-    total_pages = int(page_input.get_attribute("max"))
-    print(f"📄 Total pages: {total_pages}")
 
+def capture_page_screenshots(page, page_input, total_pages, output_dir):
+    """Old capture path: show each page in the zoomed viewer, wait, and screenshot the image."""
     downloaded_files = []
+    host_throttle = throttle.for_url(page.url)
+    previous_href = None
 
     # Capture all pages
     for page_index in range(1, total_pages + 1):
-        page_input.fill(str(page_index))
-        page.evaluate("el => el.dispatchEvent(new Event('change', { bubbles: true }))", page_input)
-        page.wait_for_timeout(3500)  # give each page time to render
+        try:
+            with host_throttle.request():
+                if page_index > 1:
+                    page_input.fill(str(page_index))
+                    page.evaluate("el => el.dispatchEvent(new Event('change', { bubbles: true }))", page_input)
+                # Wait for the viewer to switch image and for it to finish loading, not a fixed time
+                page.wait_for_function(document_grabber.page_image_changed_js, arg=previous_href, timeout=30000)
+                page.wait_for_load_state("networkidle", timeout=15000)
+        except PlaywrightTimeoutError:
+            print(f"⚠️ No image found on page {page_index}")
+            continue
+        previous_href = page.evaluate(document_grabber.page_image_href_js)
 
         img = page.query_selector("svg image")
         if not img:
@@ -375,26 +422,70 @@ def get_document(link, doc_id, county_name, page):
         downloaded_files.append(filepath)
         print(f"✅ Saved page {page_index}")
 
-    # Combine PNGs into one PDF
-    if downloaded_files:
-        image_files = sorted(glob.glob(os.path.join(output_dir, "page_*.png")))
-        first_image = Image.open(image_files[0]).convert("RGB")
-        others = [Image.open(img).convert("RGB") for img in image_files[1:]]
-        pdf_path = os.path.join(output_dir, f"{doc_id}.pdf")
-        first_image.save(pdf_path, save_all=True, append_images=others)
-        print(f"📄 Combined {len(image_files)} pages into {pdf_path}")
-
-        # Delete PNGs after creating PDF
-        for img_file in image_files:
-            os.remove(img_file)
-        print("🧹 Deleted temporary PNG files.")
-
-        #remove base_dir from pdf_path for return
-        relative_pdf_path = os.path.relpath(pdf_path, base_dir)
-        return [relative_pdf_path]
-    else:
-        print("⚠️ No images captured — skipping PDF creation.")
-        return None
+    return downloaded_files
+
+def get_document(link, doc_id, county_name, page, mode="image", max_workers=6, pdf_compression="original"):
+    """
+    Download every page of the document at `link` and store it as one PDF in the
+    content-addressed document store (document_store.py). Returns [path relative
+    to the store]; the file name is the content hash of the page images.
+
+    mode="image" (default) reads the href of each page image from the viewer and
+    saves the original bytes, waiting only until the viewer switches image.
+    The images are downloaded concurrently, up to `max_workers` at a time.
+    mode="screenshot" is the old behaviour: zoom the viewer, wait a fixed time
+    per page and screenshot the rendered image.
+
+    Pages are streamed into the PDF one at a time (document_grabber.assemble_pdf);
+    pdf_compression is "original", "gray" or "jpeg".
+    """
+    print(f"➡️ Accessing {doc_id}: {link}…")
+    try:
+        with throttle.for_url(link).request() as request:
+            request.response(page.goto(link))
+            page.wait_for_selector("input[aria-label='Page Number']", timeout=15000)
+    except PlaywrightTimeoutError:
+        pass
+
+    if mode == "screenshot":
+        # Hide panel if visible
+        hide_button = page.query_selector("button.css-okyhgk")
+        if hide_button:
+            hide_button.click()  # capture_page_screenshots waits for each page image to load
+
+        # Prepare environment for clarity
+        page.set_viewport_size({"width": 4000, "height": 3200})
+        page.evaluate("document.body.style.zoom = '200%'")
+        page.evaluate("document.body.style.background = 'white'")
+
+    # Detect total pages from input box
+    page_input = page.query_selector("input[aria-label='Page Number']")
+    if not page_input:
+        print("⚠️ Page input box not found.")
+        return []
+    total_pages = int(page_input.get_attribute("max"))
+    print(f"📄 Total pages: {total_pages}")
+
+    # Page images go to a directory only this download uses
+    output_dir = document_store.new_download_dir(county_name)
+    try:
+        if mode == "image":
+            # Learn every page's image url from the viewer, then download them concurrently
+            page_hrefs = document_grabber.collect_page_hrefs(page, page_input, total_pages)
+            downloaded_files = document_grabber.download_pages(page, page_hrefs, output_dir, max_workers=max_workers)
+        else:
+            downloaded_files = capture_page_screenshots(page, page_input, total_pages, output_dir)
+
+        # Combine page images into one PDF (in page order), stored once per unique content
+        if downloaded_files:
+            relative_pdf_path, _ = document_store.store_document(downloaded_files, county_name, compression=pdf_compression)
+            return [relative_pdf_path]
+        else:
+            print("⚠️ No images captured — skipping PDF creation.")
+            return None
+    finally:
+        # Delete page images after creating PDF
+        document_store.remove_download_dir(output_dir)
 
 
 
@@ -406,8 +497,8 @@ if __name__ == "__main__":
     search_term = "Alford John"
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        page = browser.new_page()
+        browser = browser_contexts.launch_browser(p, headless=False)
+        page = browser_contexts.new_scraping_context(browser, "document").new_page()
         
         files=get_document('https://freestone.tx.publicsearch.us/doc/94458756', "tester", county, page)
         print(files)
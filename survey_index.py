@@ -0,0 +1,178 @@
+# Per-county index of canonical survey names for fuzzy survey matching.
+# Built from the abstract/survey polygon layers (surv???p.shp, one folder per county,
+# the same data permitnormalizer/permitmap.py maps). Names are normalized and
+# deduplicated, and a trigram index limits fuzzy scoring to names that share
+# at least one trigram with the query, so a whole search table is scored at once.
+
+# Standard library
+import fnmatch
+import os
+import re
+from collections import defaultdict
+
+# Third-party packages
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process, utils
+
+survey_data_dir = r"C:\Users\milom\OneDrive\Desktop\landman\permitnormalizer\geodata\documents_20250721"
+survey_layer_pattern = "surv???p.shp"  # polygon layers only
+
+# Words that say "this is a survey" rather than name it (cf. legal_parser.unwanted_survey_phrases)
+noise_words = {"SURVEY", "SURV", "SUR", "SVY", "GRANT", "LEAGUE", "ABSTRACT", "ABST", "ABS", "THE", "OF"}
+
+_non_alnum = re.compile(r"[^A-Z0-9 ]+")
+_non_digits = re.compile(r"\D")
+
+def normalize_survey_name(name):
+    """Upper-case, punctuation and noise words removed, single spaced ("" for missing)."""
+    if not isinstance(name, str):
+        return ""
+    words = _non_alnum.sub(" ", name.upper()).split()
+    return " ".join(word for word in words if word not in noise_words)
+
+def normalize_abstract(abstract):
+    """Digits of an abstract number without leading zeros ("A-0103" -> "103")."""
+    if abstract is None or (isinstance(abstract, float) and np.isnan(abstract)):
+        return ""
+    return _non_digits.sub("", str(abstract)).lstrip("0")
+
+def trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class SurveyIndex:
+    """
+    Canonical survey names of one county.
+    names[i] is a normalized name, abstracts[i] the abstract numbers it appears under.
+    """
+
+    def __init__(self, survey_names, abstract_numbers=None, county=None):
+        self.county = county
+        if abstract_numbers is None:
+            abstract_numbers = [None] * len(survey_names)
+
+        by_name = defaultdict(set)
+        for name, abstract in zip(survey_names, abstract_numbers):
+            name = normalize_survey_name(name)
+            if name:
+                abstract = normalize_abstract(abstract)
+                by_name[name].update([abstract] if abstract else [])
+
+        self.names = sorted(by_name)
+        self.abstracts = [sorted(by_name[name]) for name in self.names]
+
+        self._by_abstract = defaultdict(list)
+        for i, abstracts in enumerate(self.abstracts):
+            for abstract in abstracts:
+                self._by_abstract[abstract].append(i)
+
+        postings = defaultdict(list)
+        for i, name in enumerate(self.names):
+            for gram in trigrams(name):
+                postings[gram].append(i)
+        self._postings = {gram: np.array(ids) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_frame(cls, df, name_column="LEVEL1_SUR", abstract_column="ABSTRACT_L", county=None):
+        return cls(df[name_column].tolist(), df[abstract_column].tolist() if abstract_column in df else None, county)
+
+    @classmethod
+    def from_shapefiles(cls, county, base_dir=survey_data_dir, name_column="LEVEL1_SUR", abstract_column="ABSTRACT_L"):
+        """Index the surv???p.shp layers found in `base_dir` folders named after `county`. None if there are none."""
+        import geopandas as gpd  # only needed to build an index
+
+        frames = []
+        for root, _, files in os.walk(base_dir):
+            if os.path.basename(root).upper().strip() != county.upper().strip():
+                continue
+            for file in files:
+                if fnmatch.fnmatch(file.lower(), survey_layer_pattern):
+                    frames.append(gpd.read_file(os.path.join(root, file), ignore_geometry=True))
+        if not frames:
+            return None
+        return cls.from_frame(pd.concat(frames, ignore_index=True), name_column, abstract_column, county)
+
+    def candidates(self, name, min_shared=1):
+        """Ids of indexed names sharing at least `min_shared` trigrams with the (normalized) name."""
+        postings = [self._postings[gram] for gram in trigrams(name) if gram in self._postings]
+        if not postings:
+            return np.array([], dtype=int)
+        ids, counts = np.unique(np.concatenate(postings), return_counts=True)
+        return ids[counts >= min_shared]
+
+    def names_for_abstract(self, abstract):
+        return [self.names[i] for i in self._by_abstract.get(normalize_abstract(abstract), [])]
+
+    def match_many(self, survey_names, score_cutoff=80, min_shared=2):
+        """
+        Best canonical match for every name: list of (canonical name, abstracts, score)
+        or None below score_cutoff. Each distinct name is scored once, against its trigram candidates only.
+        """
+        codes, uniques = pd.factorize(pd.Series([normalize_survey_name(name) for name in survey_names], dtype=object))
+        best = []
+        for name in uniques:
+            ids = self.candidates(name, min_shared) if name else []
+            match = None
+            if len(ids):
+                result = process.extractOne(name, [self.names[i] for i in ids], scorer=fuzz.token_set_ratio, processor=utils.default_process, score_cutoff=score_cutoff)
+                if result:
+                    i = ids[result[2]]
+                    match = (self.names[i], self.abstracts[i], result[1])
+            best.append(match)
+        return [best[code] for code in codes]
+
+    def target_names(self, target_abstract_number=None, target_survey_name=None, score_cutoff=90):
+        """
+        Normalized names that count as "the target survey": every indexed name recorded
+        under the target abstract, the user-entered name, and its canonical match.
+        """
+        targets = set(self.names_for_abstract(target_abstract_number)) if target_abstract_number else set()
+        name = normalize_survey_name(target_survey_name)
+        if name:
+            targets.add(name)
+            match = self.match_many([name], score_cutoff=score_cutoff)[0]
+            if match:
+                targets.add(match[0])
+        return sorted(targets)
+
+    def score_names(self, survey_names, target_names):
+        """
+        For a whole column of survey names: (best token_set_ratio against any target name,
+        whether the name contains / is contained in a target). Distinct names are scored once,
+        and names sharing no trigram with any target are skipped (score 0).
+        """
+        normalized = np.array([normalize_survey_name(name) for name in survey_names], dtype=object)
+        scores = np.zeros(len(normalized))
+        contains = np.zeros(len(normalized), dtype=bool)
+        if not target_names or not len(normalized):
+            return scores, contains
+
+        codes, uniques = pd.factorize(normalized)
+        target_grams = set().union(*(trigrams(target) for target in target_names))
+        blocked = np.fromiter((bool(name) and not trigrams(name).isdisjoint(target_grams) for name in uniques), dtype=bool, count=len(uniques))
+
+        unique_scores = np.zeros(len(uniques))
+        unique_contains = np.zeros(len(uniques), dtype=bool)
+        if blocked.any():
+            names = list(uniques[blocked])
+            unique_scores[blocked] = process.cdist(target_names, names, scorer=fuzz.token_set_ratio, processor=utils.default_process, workers=-1).max(axis=0)
+            unique_contains[blocked] = [any(t in name or name in t for t in target_names) for name in names]
+        return unique_scores[codes], unique_contains[codes]
+
+_indexes = {}
+
+def load_county_index(county, base_dir=survey_data_dir, name_column="LEVEL1_SUR", abstract_column="ABSTRACT_L"):
+    """SurveyIndex for `county`, built from its shapefiles on first use (None if the county has no survey layer)."""
+    key = (county.upper().strip(), base_dir, name_column, abstract_column)
+    if key not in _indexes:
+        index = SurveyIndex.from_shapefiles(county, base_dir, name_column, abstract_column)
+        if index is None:
+            print(f"⚠️ No {survey_layer_pattern} layer found for {county} in {base_dir}")
+        else:
+            print(f"🗺️ Indexed {len(index)} survey names for {county}")
+        _indexes[key] = index
+    return _indexes[key]
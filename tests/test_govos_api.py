@@ -0,0 +1,127 @@
+# Tests for govos_api against saved search responses (tests/fixtures/govos_search_*.json).
+# The fixtures follow the one response shape govos_api parses; replace them with real
+# captures from `python govos_api.py <county link> <search> <path>` when the site changes.
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import govos_api
+import throttle
+
+fixtures_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+county_link = "https://freestone.tx.publicsearch.us/"
+
+def load_fixture(name):
+    with open(os.path.join(fixtures_dir, name), encoding="utf-8") as f:
+        return json.load(f)
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"status {self.status_code}")
+
+class FakeSession:
+    """Replays one saved payload per request and records the params it was called with."""
+
+    def __init__(self, payloads):
+        self.payloads = list(payloads)
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, dict(params)))
+        return FakeResponse(self.payloads.pop(0))
+
+@pytest.fixture(autouse=True)
+def fast_throttle():
+    throttle.configure(county_link, rate=1000.0, max_rate=1000.0, burst=100)
+    yield
+
+def test_pages_past_server_page_cap_until_total():
+    # The server returned 2 hits per page (< page_size) but reports 3 in total
+    session = FakeSession([load_fixture("govos_search_capped_page1.json"), load_fixture("govos_search_capped_page2.json")])
+
+    results = list(govos_api.search_results("Emma Stone", county_link, session=session))
+
+    assert [doc_id for _, doc_id in results] == ["94458756", "94458757", "94460001"]
+    assert [params["offset"] for _, params in session.calls] == [0, 2]
+    assert session.calls[0][0] == "https://freestone.tx.publicsearch.us/api/search"
+
+def test_short_page_without_total_stops():
+    session = FakeSession([load_fixture("govos_search_no_total.json")])
+
+    results = list(govos_api.search_results("Emma Stone", county_link, session=session))
+
+    assert len(results) == 1
+    assert len(session.calls) == 1
+
+def test_recorded_date_range_is_sent():
+    session = FakeSession([load_fixture("govos_search_no_total.json")])
+
+    list(govos_api.search_results("Emma Stone", county_link, session=session, recorded_date_range="20240101,20240301"))
+
+    params = session.calls[0][1]
+    assert params["recordedDateRange"] == "20240101,20240301"
+    assert params["searchValue"] == "Emma Stone"
+    assert params["limit"] == govos_api.page_size
+
+def test_hit_to_cells_field_mapping():
+    hits = load_fixture("govos_search_capped_page1.json")["hits"]["hits"]
+
+    cells, doc_id = govos_api.hit_to_cells(hits[0])
+    assert doc_id == "94458756"
+    assert cells == [
+        "STONE EMMA\nSTONE ROBERT",
+        "ALFORD JOHN",
+        "WARRANTY DEED",
+        "03/14/2019",
+        "2019-00123",
+        "OR/781/87",  # rebuilt from bookType / volume / page
+        "AB#103 JOHN SMITH SUR (5.44 ACRES)",
+    ]
+
+    cells, doc_id = govos_api.hit_to_cells(hits[1])
+    assert doc_id == "94458757"
+    assert cells == [
+        "ALFORD JOHN",
+        "FIRST STATE BANK",
+        "DEED OF TRUST",
+        "03/20/2019",
+        "2019-00150",
+        "OR/781/140",
+        "MULTIPLE TRACTS SEE INSTRUMENT",
+    ]
+
+def test_hit_to_cells_optional_fields_empty():
+    hit = load_fixture("govos_search_no_total.json")["hits"]["hits"][0]
+
+    cells, doc_id = govos_api.hit_to_cells(hit)
+
+    assert doc_id == "95000001"
+    assert cells[2:5] == ["AFFIDAVIT OF HEIRSHIP", "01/05/2022", "2022-00009"]
+    assert cells[5] is None and cells[6] is None
+
+def test_hit_missing_required_key_raises():
+    hit = load_fixture("govos_search_capped_page2.json")["hits"]["hits"][0]
+    hit["_source"]["documentNumber"] = hit["_source"].pop("docNumber")  # renamed upstream
+
+    with pytest.raises(govos_api.UnexpectedResponse, match="docNumber"):
+        govos_api.hit_to_cells(hit)
+
+def test_unknown_response_shape_raises():
+    session = FakeSession([{"results": [{"id": "95000001", "docNumber": "2022-00009"}]}])
+
+    with pytest.raises(govos_api.UnexpectedResponse, match="hits"):
+        list(govos_api.search_results("Emma Stone", county_link, session=session))
@@ -0,0 +1,196 @@
+# Per-host politeness scheduler shared by every scraper (sync, async, threads).
+# Each county host gets a token bucket whose rate adapts to how the host responds:
+# fast successes raise the rate a little at a time, slow responses lower it (against
+# separate latency targets for plain HTTP requests and whole browser navigations), and
+# 429/503 or errors cut it hard (and honor Retry-After), so we go as fast as each
+# GovOS instance tolerates without getting blocked.
+# Buckets live in one process: worker pools call set_process_count() so each of N
+# processes uses 1/N of a host's budget.
+
+# Standard library
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+throttle_statuses = {429, 503}
+
+def retry_after_seconds(value):
+    """Seconds from a Retry-After header value (None if missing or in the HTTP-date form)."""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+class RequestResult:
+    """Filled in by the caller inside HostThrottle.request() so the response status reaches record()."""
+
+    def __init__(self):
+        self.status = None
+        self.retry_after = None
+
+    def response(self, response):
+        """Take status and Retry-After from a Playwright Response (page.goto()'s return value, may be None). Returns it."""
+        if response is not None:
+            self.status = response.status
+            self.retry_after = retry_after_seconds(response.headers.get("retry-after"))
+        return response
+
+class HostThrottle:
+    """
+    Token bucket for one host with additive-increase / multiplicative-decrease of its rate.
+    reserve() takes a token and returns how long the caller must wait before using it.
+    `share` is the fraction of the host's budget this process may use: rates, burst and
+    increase are scaled by it so N processes with share 1/N stay within one budget.
+    """
+
+    def __init__(self, host, rate=2.0, min_rate=0.2, max_rate=10.0, burst=4,
+                 target_latency=2.0, navigation_latency=10.0, increase=0.2, slow_factor=0.8,
+                 error_factor=0.7, throttled_factor=0.5, share=1.0):
+        self.host = host
+        self.share = share
+        self.rate = rate * share            # requests per second right now
+        self.min_rate = min_rate * share
+        self.max_rate = max_rate * share
+        self.burst = max(1.0, burst * share)
+        self.target_latency = target_latency  # seconds; slower HTTP responses lower the rate
+        # Browser navigations are timed click/goto through the rendered results, which takes far
+        # longer than the HTTP round trip, so they are held to their own target
+        self.navigation_latency = navigation_latency
+        self.increase = increase * share
+        self.slow_factor = slow_factor
+        self.error_factor = error_factor
+        self.throttled_factor = throttled_factor
+
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take a token now (the balance may go negative) and return the seconds to wait before the request."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            self.requests += 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, latency, status=None, error=False, retry_after=None, navigation=False):
+        """
+        Adapt the rate to one finished request (latency in seconds, HTTP status if known).
+        navigation=True for browser work (goto/click + waiting for the page), judged against navigation_latency.
+        """
+        target = self.navigation_latency if navigation else self.target_latency
+        with self._lock:
+            if status in throttle_statuses:
+                self.throttled += 1
+                self.rate = max(self.min_rate, self.rate * self.throttled_factor)
+                pause = retry_after if retry_after is not None else 1 / self.rate
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+                print(f"🐢 {self.host} is throttling us ({status}), slowing to {self.rate:.2f} req/s")
+            elif error or (status is not None and status >= 500):
+                self.errors += 1
+                self.rate = max(self.min_rate, self.rate * self.error_factor)
+            elif latency > target:
+                self.rate = max(self.min_rate, self.rate * self.slow_factor)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    @contextmanager
+    def request(self):
+        """
+        Wait for a token, then time the browser work in the block and record it as a
+        navigation (an exception counts as an error).
+        Yields a RequestResult; pass navigations through it so 429/503 slow the host down:
+            with host_throttle.request() as result:
+                result.response(page.goto(url))
+        """
+        self.acquire()
+        result = RequestResult()
+        start = time.monotonic()
+        try:
+            yield result
+        except Exception:
+            self.record(time.monotonic() - start, status=result.status, error=True, retry_after=result.retry_after, navigation=True)
+            raise
+        self.record(time.monotonic() - start, status=result.status, retry_after=result.retry_after, navigation=True)
+
+    def record_response(self, response, latency, error=False, navigation=False):
+        """
+        record() for a requests.Response or a Playwright Response (None when a navigation
+        returned none), reading Retry-After when the host sends one.
+        """
+        if response is None:
+            self.record(latency, error=error, navigation=navigation)
+            return
+        status = response.status_code if hasattr(response, "status_code") else response.status
+        retry_after = retry_after_seconds(response.headers.get("retry-after"))
+        self.record(latency, status=status, error=error, retry_after=retry_after, navigation=navigation)
+
+    def info(self):
+        return {
+            "host": self.host,
+            "rate": round(self.rate, 3),
+            "share": self.share,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "errors": self.errors,
+        }
+
+_throttles = {}
+_defaults = {}
+_share = 1.0
+_registry_lock = threading.Lock()
+
+def _host(url):
+    return urlsplit(url).netloc.lower() or url.lower()
+
+def configure(url, **settings):
+    """Override HostThrottle settings (rate, max_rate, burst, ...) for the host of `url`."""
+    host = _host(url)
+    with _registry_lock:
+        _defaults[host] = settings
+        _throttles.pop(host, None)
+
+def set_process_count(processes):
+    """
+    Declare that `processes` processes scrape the same hosts with their own throttles
+    (download_worker.py), so each one only uses 1/processes of every host's budget.
+    """
+    global _share
+    with _registry_lock:
+        _share = 1.0 / max(1, processes)
+        _throttles.clear()
+
+def for_url(url):
+    """The shared HostThrottle for the host of `url` (county link, page url or API url)."""
+    host = _host(url)
+    with _registry_lock:
+        throttle = _throttles.get(host)
+        if throttle is None:
+            throttle = _throttles[host] = HostThrottle(host, **{"share": _share, **_defaults.get(host, {})})
+        return throttle
+
+def stats():
+    with _registry_lock:
+        return [throttle.info() for throttle in _throttles.values()]
@@ -1,4 +1,7 @@
-import fuzzywuzzy as fuzz
+# Third-party packages
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process, utils
 
 def in_range(r, prev, nxt):
     d = r.get("recorded_date")
@@ -28,7 +31,79 @@ def filter_documents(rows, previous_ownership_date, next_ownership_date):
     rows = [r for r in rows if in_range(r, previous_ownership_date, next_ownership_date)]
     return rows
 
-def order_documents(rows, target_abstract_number, target_survey_name, previous_ownership_date, next_ownership_date):
+# Columns order_documents reads from each row
+score_fields = ["abstract_num", "survey_name", "subdivision", "case_number", "misc_legal", "doc_type", "recorded_date"]
+
+# Priority 7 doc types (substring match)
+judgement_keywords = ["JUDGMENT", "AFFIDAVIT", "HEIRSHIP", "CC JUDGMT"]
+
+# Fuzzy survey name score cutoffs -> priority 3 / 4 / 5
+fuzzy_tiers = [(95, 3), (90, 4), (80, 5)]
+
+def _text_column(df, field):
+    """Column as stripped upper-case strings, "" for missing values."""
+    return df[field].fillna("").astype(str).str.strip().str.upper()
+
+def _survey_scores(survey_names, target_survey_name):
+    """
+    token_set_ratio of every survey name against the target, scoring each distinct
+    name once in a single batched rapidfuzz call (with fuzzywuzzy's lower-case /
+    strip-punctuation preprocessing, so scores match the old fuzz.token_set_ratio). Also returns whether each name is
+    a substring of the target or contains it (the "exact" priority 2 test).
+    """
+    codes, uniques = pd.factorize(survey_names)
+    if not target_survey_name or not len(uniques):
+        return np.zeros(len(survey_names)), np.zeros(len(survey_names), dtype=bool)
+
+    scores = process.cdist([target_survey_name], list(uniques), scorer=fuzz.token_set_ratio, processor=utils.default_process, workers=-1)[0]
+    contains = np.fromiter(
+        (bool(name) and (target_survey_name in name or name in target_survey_name) for name in uniques),
+        dtype=bool, count=len(uniques),
+    )
+    return scores[codes], contains[codes]
+
+def score_documents(df, target_abstract_number, target_survey_name=None, survey_index=None):
+    """
+    Priority (1 best .. 8) for every row of a search table DataFrame, computed
+    column-wise with one fuzzy-matching pass. See order_documents for the tiers.
+    With a survey_index.SurveyIndex, survey names are compared (normalized) against
+    the county's canonical names for the target abstract / survey instead.
+    """
+    target_abstract = str(target_abstract_number or "").strip().upper()
+    target_survey = str(target_survey_name or "").strip().upper()
+
+    abstract_num = _text_column(df, "abstract_num")
+    survey_name = _text_column(df, "survey_name")
+    subdivision = _text_column(df, "subdivision")
+    case_number = _text_column(df, "case_number")
+    doc_type = _text_column(df, "doc_type")
+
+    has_survey = (survey_name != "").to_numpy()
+    if survey_index is not None:
+        target_names = survey_index.target_names(target_abstract, target_survey)
+        scores, contains = survey_index.score_names(survey_name.to_numpy(), target_names)
+        fuzzy = has_survey & bool(target_names)
+    else:
+        scores, contains = _survey_scores(survey_name.to_numpy(), target_survey)
+        fuzzy = has_survey & bool(target_survey)
+
+    conditions = [
+        ((abstract_num != "") & (abstract_num == target_abstract)).to_numpy() if target_abstract else np.zeros(len(df), dtype=bool),
+        fuzzy & contains,
+    ]
+    choices = [1, 2]
+    for cutoff, priority in fuzzy_tiers:
+        conditions.append(fuzzy & (scores >= cutoff))
+        choices.append(priority)
+    conditions += [
+        ((abstract_num == "") & (subdivision == "") & (case_number == "") & (survey_name == "")).to_numpy(),
+        doc_type.str.contains("|".join(judgement_keywords), regex=True).to_numpy(),
+    ]
+    choices += [6, 7]
+    # First matching condition wins, like the per-row if/continue chain it replaces
+    return np.select(conditions, choices, default=8)
+
+def order_documents(rows, target_abstract_number, target_survey_name=None, previous_ownership_date=None, next_ownership_date=None, survey_index=None):
     """
     Orders and filters search results PRIOR to document-level scraping.
 
@@ -41,6 +116,10 @@ def order_documents(rows, target_abstract_number, target_survey_name, previous_o
 
     Pipeline Overview
     -----------------
+    1. Optional Filtering
+        Rows recorded outside previous_ownership_date..next_ownership_date are
+        dropped (rows with no date are kept), same as filter_documents.
+
     2. Priority Classification
         Each row receives a priority score based on data strength:
             Priority 1 — Exact abstract number 
@@ -53,7 +132,8 @@ def order_documents(rows, target_abstract_number, target_survey_name, previous_o
 
     3. Final Ordering
         Rows are sorted by:
-            ( priority ASC, recorded_date DESC )
+            ( priority ASC, DEED types first, recorded_date DESC )
+        with undated rows last in their group.
 
 
     4. OCR Fallback
@@ -85,66 +165,32 @@ def order_documents(rows, target_abstract_number, target_survey_name, previous_o
         `abstract_num`, `survey_name`, and `misc_legal`.
     • The purpose is to maximize scraping value + efficiency, NOT to preserve
         chronological order in the database.
+    • Scoring runs column-wise on a DataFrame (score_documents); the row dicts
+        themselves are returned unchanged apart from `priority`.
+    • survey_index (survey_index.load_county_index) matches survey names against
+        the county's canonical names, so priorities 2-5 also work from the target
+        abstract number alone.
     """
+    if previous_ownership_date is not None or next_ownership_date is not None:
+        rows = filter_documents(rows, previous_ownership_date, next_ownership_date)
+    if not rows:
+        return []
 
-    # Step 2: Priority Classification
-    for r in rows:
-        abstract_num = r.get("abstract_num", "").strip().upper()
-        survey_name = r.get("survey_name", "").strip().upper()
-        subdivision = r.get("subdivision", "").strip().upper()
-        case_number = r.get("case_number", "").strip().upper()
-        misc_legal = r.get("misc_legal", "").strip().upper()
-        doc_type = r.get("doc_type", "").strip().upper()
-
-        # Priority 1: Exact abstract number 
-        if abstract_num and abstract_num == target_abstract_number:
-            r["priority"] = 1
-            continue
-
-        # Priority 2: Exact survey name match
-        if survey_name and target_survey_name and (target_survey_name in survey_name or survey_name in target_survey_name):
-            r["priority"] = 2
-            continue
-        
-        # Priority 3-5: Fuzzy / similar survey name
-        if survey_name and target_survey_name:
-            ratio = fuzz.token_set_ratio(survey_name, target_survey_name)
-            if ratio >= 95:
-                r["priority"] = 3
-            elif ratio >= 90:
-                r["priority"] = 4
-            elif ratio >= 80:
-                r["priority"] = 5
-            continue
-        # Priority 6: Inconclusive or vague legal descriptions
-        if not abtract_num and not subdivision and not case_number and not survey_name:
-            r["priority"] = 6
-            continue
-        # Priority 7: Judgement / Affidavit / Heirship / CC JUDGMT types
-        if any(keyword in doc_type for keyword in ["JUDGMENT", "AFFIDAVIT", "HEIRSHIP", "CC JUDGMT"]):
-            r["priority"] = 7
-            continue
-        # Priority 8: Remaining rows
-        r["priority"] = 8
-        
-        # Step 3: Final Ordering
-        # 3) weakest criteria -> sort first
-        rows.sort(key=lambda r: -(r.get("recorded_date") or date.min).toordinal())
-
-        # 2)
-        rows.sort(key=lambda r: 0 if "DEED" in (r.get("doc_type","").upper()) else 1)
-
-        # 1) strongest criteria -> sort last
-        rows.sort(key=lambda r: r["priority"])
-    return rows
-
-
-        
-        
-
-        
-
-
-
-
+    df = pd.DataFrame.from_records(rows, columns=score_fields)
 
+    # Step 2: Priority Classification
+    priorities = score_documents(df, target_abstract_number, target_survey_name, survey_index)
+
+    # Step 3: Final Ordering, one stable composite sort (last key is the primary one)
+    is_deed = _text_column(df, "doc_type").str.contains("DEED", regex=False).to_numpy()
+    recorded = pd.to_datetime(df["recorded_date"], errors="coerce")
+    newest_first = -(recorded - pd.Timestamp("1970-01-01")).dt.days.to_numpy(dtype=float)
+    newest_first = np.nan_to_num(newest_first, nan=np.inf)  # undated rows last
+    order = np.lexsort((newest_first, ~is_deed, priorities))
+
+    ordered = []
+    for i in order:
+        row = rows[i]
+        row["priority"] = int(priorities[i])
+        ordered.append(row)
+    return ordered